@@ -0,0 +1,147 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Expired rows are purged on startup and then once every this many puts
+PURGE_EVERY_PUTS = 256
+
+class AnalysisCache:
+    """SQLite-backed cache of vision analyses with TTL and in-flight coalescing
+
+    Results are keyed on the image bytes, the user prompt and the model.
+    Concurrent callers asking for the same key while a request is in flight
+    wait for that request instead of starting their own upstream call.
+    """
+
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600, purge_every=PURGE_EVERY_PUTS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.purge_every = purge_every
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.purged = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS analyses ("
+                "key TEXT PRIMARY KEY, result TEXT NOT NULL, "
+                "created_at REAL NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS analyses_expires_at ON analyses (expires_at)")
+        self.purge_expired()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=10)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def make_key(image_bytes, prompt, model):
+        digest = hashlib.sha256()
+        digest.update(hashlib.sha256(image_bytes).digest())
+        digest.update(model.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(prompt.strip().encode('utf-8'))
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return the cached result for ``key`` or None if missing or expired"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT result FROM analyses WHERE key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, key, result):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO analyses (key, result, created_at, expires_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(result), now, now + self.ttl_seconds),
+            )
+        with self._lock:
+            self._puts += 1
+            purge = self.purge_every and self._puts % self.purge_every == 0
+        if purge:
+            self.purge_expired()
+
+    def purge_expired(self):
+        """Delete expired rows and return how many were removed"""
+        with self._connect() as conn:
+            removed = conn.execute("DELETE FROM analyses WHERE expires_at <= ?", (time.time(),)).rowcount
+        with self._lock:
+            self.purged += removed
+        return removed
+
+    def get_or_compute(self, key, compute):
+        """Return the cached result for ``key``, calling ``compute()`` at most once
+
+        Exceptions from ``compute`` are propagated to every waiting caller and
+        are not cached.
+        """
+        result = self.get(key)
+        if result is not None:
+            with self._lock:
+                self.hits += 1
+            return result
+
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = {"event": threading.Event(), "result": None, "error": None}
+                self._inflight[key] = call
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call["event"].wait()
+            if call["error"] is not None:
+                raise call["error"]
+            return call["result"]
+
+        try:
+            # Another leader may have stored the result between our miss and
+            # taking the lock; read again before going upstream
+            call["result"] = self.get(key)
+            with self._lock:
+                if call["result"] is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            if call["result"] is None:
+                call["result"] = compute()
+                self.put(key, call["result"])
+            return call["result"]
+        except Exception as e:
+            call["error"] = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call["event"].set()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._inflight),
+                "purged": self.purged,
+                "ttl_seconds": self.ttl_seconds,
+            }
@@ -1,68 +1,307 @@
-from flask import Flask, request, jsonify, send_from_directory, send_file
+from flask import Flask, request, jsonify, send_from_directory, send_file, stream_with_context
 import os
 import base64
+import hashlib
+import importlib.util
 import json
 from datetime import datetime
 from dotenv import load_dotenv
 from werkzeug.utils import secure_filename
-from PIL import Image, ImageEnhance, ImageFilter
+from PIL import Image, ImageFilter
 import io
+import queue
+import shutil
+import threading
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from analysis_cache import AnalysisCache
+from image_prep import PreparedImage, prepare_image
+from janitor import Janitor
+from jobs import JobQueue, QueueFullError, RateLimiter
+from lut_adjust import EditSessions, apply_deltas, encode_proxy_preview, make_proxy
+from lut_cache import LUTCache, lut_cache_key
+from metrics import Metrics
+from previews import (
+    EAGER_VARIANTS, FORMAT_MIMETYPES, PREVIEW_DIRECTORY, defer_preview_variants, etag_for,
+    render_deferred_preview, render_preview_variants, save_preview_variants,
+)
 
 load_dotenv()
 app = Flask(__name__)
 app.config["SECRET_KEY"] = os.environ.get("SECRET_KEY", "dev-secret-key")
-app.config["MAX_CONTENT_LENGTH"] = 16 * 1024 * 1024
+app.config["UPLOAD_MAX_BYTES"] = int(os.environ.get("UPLOAD_MAX_BYTES", 16 * 1024 * 1024))
+app.config["VIDEO_MAX_BYTES"] = int(os.environ.get("VIDEO_MAX_BYTES", 1024 * 1024 * 1024))
+# Hard ceiling for every route; check_upload_size() applies the per-route limits
+app.config["MAX_CONTENT_LENGTH"] = max(app.config["UPLOAD_MAX_BYTES"], app.config["VIDEO_MAX_BYTES"])
+app.config["LUT_SIZE"] = int(os.environ.get("LUT_SIZE", 32))
+app.config["LUT_STORE_DTYPE"] = os.environ.get("LUT_STORE_DTYPE", "float32")
+app.config["LUT_CACHE_MAX_ENTRIES"] = int(os.environ.get("LUT_CACHE_MAX_ENTRIES", 128))
+app.config["LUT_CACHE_MAX_BYTES"] = int(os.environ.get("LUT_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+app.config["VISION_MAX_EDGE"] = int(os.environ.get("VISION_MAX_EDGE", 1024))
+app.config["VISION_JPEG_QUALITY"] = int(os.environ.get("VISION_JPEG_QUALITY", 85))
+app.config["LOCAL_ANALYSIS"] = os.environ.get("LOCAL_ANALYSIS", "auto")
+app.config["STATS_THUMBNAIL_EDGE"] = int(os.environ.get("STATS_THUMBNAIL_EDGE", 512))
+app.config["PREVIEW_INTERPOLATION"] = os.environ.get("PREVIEW_INTERPOLATION", "trilinear")
+app.config["PREVIEW_UINT8"] = os.environ.get("PREVIEW_UINT8", "1") == "1"
+app.config["UINT8_TABLE_CACHE_BYTES"] = int(os.environ.get("UINT8_TABLE_CACHE_BYTES", 64 * 1024 * 1024))
+app.config["JOB_WORKERS"] = int(os.environ.get("JOB_WORKERS", 4))
+app.config["JOB_QUEUE_MAX"] = int(os.environ.get("JOB_QUEUE_MAX", 32))
+app.config["JOB_RESULT_TTL"] = int(os.environ.get("JOB_RESULT_TTL", 3600))
+app.config["BATCH_MAX_ITEMS"] = int(os.environ.get("BATCH_MAX_ITEMS", 48))
+app.config["BATCH_CONCURRENCY"] = int(os.environ.get("BATCH_CONCURRENCY", 4))
+app.config["BATCH_RATE_LIMIT"] = float(os.environ.get("BATCH_RATE_LIMIT", 2.0))
+app.config["OPENAI_MODEL"] = os.environ.get("OPENAI_MODEL", "gpt-4o")
+app.config["OPENAI_MAX_CONNECTIONS"] = int(os.environ.get("OPENAI_MAX_CONNECTIONS", 16))
+app.config["OPENAI_KEEPALIVE_EXPIRY"] = float(os.environ.get("OPENAI_KEEPALIVE_EXPIRY", 30))
+app.config["OPENAI_TIMEOUT"] = float(os.environ.get("OPENAI_TIMEOUT", 60))
+app.config["ANALYSIS_CACHE_PATH"] = os.environ.get("ANALYSIS_CACHE_PATH", "cache/analysis_cache.sqlite3")
+app.config["ANALYSIS_CACHE_TTL"] = int(os.environ.get("ANALYSIS_CACHE_TTL", 7 * 24 * 3600))
+app.config["APPLY_MODE"] = os.environ.get("APPLY_MODE", "thread")
+app.config["APPLY_WORKERS"] = int(os.environ.get("APPLY_WORKERS", 0))
+app.config["JANITOR_INTERVAL"] = int(os.environ.get("JANITOR_INTERVAL", 300))
+app.config["TEMP_MAX_AGE"] = int(os.environ.get("TEMP_MAX_AGE", 3600))
+app.config["TEMP_MAX_BYTES"] = int(os.environ.get("TEMP_MAX_BYTES", 512 * 1024 * 1024))
+app.config["LUT_MAX_AGE"] = int(os.environ.get("LUT_MAX_AGE", 30 * 24 * 3600))
+app.config["LUT_MAX_BYTES"] = int(os.environ.get("LUT_MAX_BYTES", 1024 * 1024 * 1024))
+app.config["PREVIEW_MAX_AGE"] = int(os.environ.get("PREVIEW_MAX_AGE", 7 * 24 * 3600))
+app.config["PREVIEW_MAX_BYTES"] = int(os.environ.get("PREVIEW_MAX_BYTES", 1024 * 1024 * 1024))
+app.config["VIDEO_BATCH_FRAMES"] = int(os.environ.get("VIDEO_BATCH_FRAMES", 8))
+app.config["VIDEO_FOURCC"] = os.environ.get("VIDEO_FOURCC", "mp4v")
+app.config["VIDEO_STAGING_DIRECTORY"] = os.environ.get("VIDEO_STAGING_DIRECTORY", "cache/video_staging")
+app.config["EDIT_SESSIONS_MAX_ENTRIES"] = int(os.environ.get("EDIT_SESSIONS_MAX_ENTRIES", 32))
+app.config["EDIT_SESSIONS_MAX_BYTES"] = int(os.environ.get("EDIT_SESSIONS_MAX_BYTES", 256 * 1024 * 1024))
+app.config["ADJUST_PROXY_EDGE"] = int(os.environ.get("ADJUST_PROXY_EDGE", 256))
+app.config["SERVER_TIMING"] = os.environ.get("SERVER_TIMING", "0") == "1"
+
+lut_cache = LUTCache(
+    max_entries=app.config["LUT_CACHE_MAX_ENTRIES"],
+    max_bytes=app.config["LUT_CACHE_MAX_BYTES"],
+)
+job_queue = JobQueue(
+    max_workers=app.config["JOB_WORKERS"],
+    max_pending=app.config["JOB_QUEUE_MAX"],
+    result_ttl=app.config["JOB_RESULT_TTL"],
+)
+batch_rate_limiter = RateLimiter(app.config["BATCH_RATE_LIMIT"])
+analysis_cache = AnalysisCache(
+    app.config["ANALYSIS_CACHE_PATH"],
+    ttl_seconds=app.config["ANALYSIS_CACHE_TTL"],
+)
+edit_sessions = EditSessions(
+    max_entries=app.config["EDIT_SESSIONS_MAX_ENTRIES"],
+    max_bytes=app.config["EDIT_SESSIONS_MAX_BYTES"],
+)
+metrics = Metrics()
+metrics.add_collector(lambda: [
+    (f"cache_{outcome}_total", {"cache": name}, cache.stats()[outcome])
+    for name, cache in (("analysis", analysis_cache), ("lut", lut_cache))
+    for outcome in ("hits", "misses")
+])
+# Created here rather than in __main__ so WSGI servers get them too
+for directory in ("static/temp", "static/luts", PREVIEW_DIRECTORY, app.config["VIDEO_STAGING_DIRECTORY"]):
+    os.makedirs(directory, exist_ok=True)
+
+# Evicts previews, graded videos and LUT sidecars by age and disk quota
+janitor = Janitor({
+    "static/temp": (app.config["TEMP_MAX_AGE"], app.config["TEMP_MAX_BYTES"]),
+    "static/luts": (app.config["LUT_MAX_AGE"], app.config["LUT_MAX_BYTES"]),
+    PREVIEW_DIRECTORY: (app.config["PREVIEW_MAX_AGE"], app.config["PREVIEW_MAX_BYTES"]),
+}, interval=app.config["JANITOR_INTERVAL"]).start()
+# Started on first use when APPLY_MODE=process
+lut_pool = None
+# Baked 8-bit tables for previews, created on first use
+uint8_tables = None
+lut_pool_lock = threading.Lock()
+# LUT keys being generated right now, so identical requests wait instead of racing
+lut_inflight = {}
+lut_inflight_lock = threading.Lock()
 
 # OpenAI integration - REQUIRED (no fallback)
+# The client itself is created lazily, once per process, by get_openai_client
 try:
-    from openai import OpenAI
+    if importlib.util.find_spec("openai") is None:
+        raise ImportError("No module named 'openai'")
     
     api_key = os.environ.get("OPENAI_API_KEY")
     if not api_key:
         raise ValueError("OPENAI_API_KEY environment variable is required")
     
-    openai_client = OpenAI(api_key=api_key)
     OPENAI_AVAILABLE = True
     print("✅ OpenAI integration enabled - REAL AI MODE ONLY")
 except ImportError as e:
     print(f"❌ CRITICAL ERROR: OpenAI package not available: {e}")
     print("Install with: pip install openai")
     OPENAI_AVAILABLE = False
-    openai_client = None
 except ValueError as e:
     print(f"❌ CRITICAL ERROR: {e}")
     print("Set your OpenAI API key in the .env file")
     OPENAI_AVAILABLE = False
-    openai_client = None
+
+openai_clients = {}
+openai_clients_lock = threading.Lock()
+
+def get_openai_client():
+    """Return this process's OpenAI client, creating it on first use
+    
+    Clients are keyed by process id, so each gunicorn worker builds its own
+    after the fork instead of sharing sockets with the master. The client
+    keeps a pool of keep-alive connections shared by the worker's threads.
+    """
+    pid = os.getpid()
+    client = openai_clients.get(pid)
+    if client is not None:
+        return client
+    with openai_clients_lock:
+        if pid not in openai_clients:
+            import httpx
+            from openai import OpenAI
+            http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=app.config["OPENAI_MAX_CONNECTIONS"],
+                    max_keepalive_connections=app.config["OPENAI_MAX_CONNECTIONS"],
+                    keepalive_expiry=app.config["OPENAI_KEEPALIVE_EXPIRY"],
+                ),
+                timeout=httpx.Timeout(app.config["OPENAI_TIMEOUT"], connect=10.0),
+            )
+            openai_clients.clear()
+            openai_clients[pid] = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"), http_client=http_client)
+        return openai_clients[pid]
 
 ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg"}
+VIDEO_UPLOAD_EXTENSIONS = {"mp4", "mov", "avi", "mkv", "m4v", "webm"}
+MIN_LUT_SIZE = 2
+STREAM_KEEPALIVE_SECONDS = 15
+MAX_LUT_SIZE = 65
 
 def allowed_file(filename):
     return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def encode_image(image_path):
-    """Encode image to base64 for OpenAI API"""
-    with open(image_path, "rb") as image_file:
-        return base64.b64encode(image_file.read()).decode('utf-8')
+def encode_image(prepared, max_edge=None):
+    """Encode the downscaled JPEG of a prepared upload to base64 for OpenAI API"""
+    with metrics.stage("vision_jpeg"):
+        jpeg = prepared.vision_jpeg(max_edge)
+    with metrics.stage("base64_encode"):
+        return base64.b64encode(jpeg).decode('utf-8')
 
-def analyze_image_with_openai(image_path, user_prompt):
-    """Analyze image using OpenAI Vision API and generate LUT instructions - REAL AI ONLY"""
-    if not OPENAI_AVAILABLE or not openai_client:
-        raise Exception("OpenAI integration is not available. Real AI analysis cannot be performed. Please check your API key and installation.")
+def prepare_upload(source):
+    """Decode an upload once using the configured vision preprocessing settings"""
+    with metrics.stage("image_decode"):
+        return prepare_image(
+            source,
+            max_edge=app.config["VISION_MAX_EDGE"],
+            quality=app.config["VISION_JPEG_QUALITY"],
+        )
+
+# Where each analysis path's instructions come from, for responses and logs
+ANALYSIS_SOURCES = {
+    "local_preset": "a local preset",
+    "vision_stats": "OpenAI vision with local image statistics",
+    "vision_full": "OpenAI vision",
+}
+
+def analyze_image(prepared, user_prompt, client=None, rate_limiter=None):
+    """Produce grading instructions, locally when possible, and report how
+    
+    Returns ``(lut_instructions, analysis)``, where ``analysis["path"]`` is
+    ``local_preset`` (a stock look answered from local image statistics,
+    no network call), ``vision_stats`` (statistics plus a low-detail
+    thumbnail sent to the vision model) or ``vision_full`` (the full vision
+    payload, when ``LOCAL_ANALYSIS=off``).
+    """
+    mode = app.config["LOCAL_ANALYSIS"]
+    if mode == "off":
+        metrics.inc("analysis_path_total", {"path": "vision_full"})
+        return analyze_image_with_openai(prepared, user_prompt, client=client, rate_limiter=rate_limiter), {"path": "vision_full"}
     
+    from image_stats import match_preset, preset_instructions
+    with metrics.stage("image_stats"):
+        image_stats = prepared.image_stats()
+    preset = match_preset(user_prompt) if mode == "auto" else None
+    if preset is not None:
+        name, intensity = preset
+        print(f"⚡ Answered '{user_prompt}' locally with the {name} preset")
+        metrics.inc("analysis_path_total", {"path": "local_preset"})
+        analysis = {"path": "local_preset", "preset": name, "intensity": intensity, "image_stats": image_stats}
+        return preset_instructions(name, image_stats, intensity), analysis
+    
+    metrics.inc("analysis_path_total", {"path": "vision_stats"})
+    lut_instructions = analyze_image_with_openai(
+        prepared, user_prompt, client=client, rate_limiter=rate_limiter, image_stats=image_stats
+    )
+    return lut_instructions, {"path": "vision_stats", "image_stats": image_stats}
+
+def needs_openai(user_prompt):
+    """Whether analyzing ``user_prompt`` calls OpenAI rather than a local preset"""
+    if app.config["LOCAL_ANALYSIS"] != "auto":
+        return True
+    from image_stats import match_preset
+    return match_preset(user_prompt) is None
+
+def openai_unavailable_response():
+    return jsonify({
+        "error": "OpenAI integration is required for real AI analysis",
+        "message": "This prompt needs OpenAI analysis, which is not configured. Please check your API key configuration.",
+        "required_action": "Set OPENAI_API_KEY environment variable"
+    }), 503
+
+def analyze_image_with_openai(image, user_prompt, client=None, rate_limiter=None, image_stats=None):
+    """Analyze image using OpenAI Vision API and generate LUT instructions - REAL AI ONLY
+    
+    Results are cached on disk keyed on (image bytes, prompt, model), and
+    concurrent identical requests share one upstream call. Pass ``client``
+    to use a different OpenAI-compatible client, e.g. a stub in tests.
+    ``image`` is a PreparedImage or a path to the uploaded file. A
+    ``rate_limiter`` is only consulted when an upstream call is needed.
+    With ``image_stats`` the model gets those statistics and a small
+    low-detail thumbnail instead of the full vision payload.
+    """
+    if client is None:
+        if not OPENAI_AVAILABLE:
+            raise Exception("OpenAI integration is not available. Real AI analysis cannot be performed. Please check your API key and installation.")
+        client = get_openai_client()
+    
+    prepared = image if isinstance(image, PreparedImage) else prepare_upload(image)
+    model = app.config["OPENAI_MODEL"]
+    # Stats-based and full analyses of the same upload are cached separately
+    key = analysis_cache.make_key(prepared.raw_bytes, user_prompt, model if image_stats is None else f"{model}+stats")
+    
+    def compute():
+        if rate_limiter is not None:
+            rate_limiter.acquire()
+        return request_openai_analysis(client, prepared, user_prompt, model, image_stats=image_stats)
+    
+    return analysis_cache.get_or_compute(key, compute)
+
+def request_openai_analysis(client, prepared, user_prompt, model, image_stats=None):
+    """Make the upstream vision call and parse its JSON grading instructions"""
     try:
-        base64_image = encode_image(image_path)
+        if image_stats is None:
+            base64_image = encode_image(prepared)
+            image_detail = "auto"
+            analysis_hint = "Analyze the image's current color temperature, contrast, and lighting conditions, then provide specific numeric adjustments to achieve the requested look."
+        else:
+            base64_image = encode_image(prepared, app.config["STATS_THUMBNAIL_EDGE"])
+            image_detail = "low"
+            analysis_hint = (
+                f"Statistics measured locally on the full image (sRGB, 0-1): {json.dumps(image_stats, separators=(',', ':'))}\n\n"
+                "The attached image is a small thumbnail. Use it for content and mood, and rely on the statistics for the "
+                "current exposure, contrast and color balance, then provide specific numeric adjustments to achieve the requested look."
+            )
+        stats = prepared.stats()
+        print(f"📉 Vision payload {stats['vision_bytes']} bytes ({stats['bytes_saved']} bytes saved)")
         
-        print(f"🧠 Sending image to OpenAI GPT-4o Vision for analysis...")
-        response = openai_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": f"""Analyze this image and the user's request: "{user_prompt}"
+        print(f"🧠 Sending image to OpenAI {model} Vision for analysis...")
+        with metrics.stage("openai_call"):
+            response = client.chat.completions.create(
+                model=model,
+                messages=[
+                    {
+                        "role": "user",
+                        "content": [
+                            {
+                                "type": "text",
+                                "text": f"""Analyze this image and the user's request: "{user_prompt}"
 
 Please provide specific color grading instructions that would achieve the desired look. Return a JSON object with these exact keys:
 {{
@@ -87,71 +326,254 @@ Please provide specific color grading instructions that would achieve the desire
     "description": "detailed explanation of the color grading approach"
 }}
 
-Analyze the image's current color temperature, contrast, and lighting conditions, then provide specific numeric adjustments to achieve the requested look."""
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}"
+{analysis_hint}"""
+                            },
+                            {
+                                "type": "image_url",
+                                "image_url": {
+                                    "url": f"data:image/jpeg;base64,{base64_image}",
+                                    "detail": image_detail
+                                }
                             }
-                        }
-                    ]
-                }
-            ],
-            max_tokens=1500
-        )
+                        ]
+                    }
+                ],
+                max_tokens=1500
+            )
         
         print(f"✅ OpenAI response received successfully")
         
         # Parse the JSON response
         content = response.choices[0].message.content
         try:
-            json_start = content.find('{')
-            json_end = content.rfind('}') + 1
-            json_content = content[json_start:json_end]
-            result = json.loads(json_content)
+            with metrics.stage("json_parse"):
+                json_start = content.find('{')
+                json_end = content.rfind('}') + 1
+                json_content = content[json_start:json_end]
+                result = json.loads(json_content)
             print(f"🎨 Generated color grading: {result.get('base_style', 'Custom Look')}")
             return result
         except json.JSONDecodeError as e:
-            raise Exception(f"OpenAI returned invalid JSON response: {e}")
+            raise Exception(f"OpenAI returned invalid JSON response: {e}") from e
             
     except Exception as e:
+        metrics.error("openai_invalid_json" if isinstance(e.__cause__, json.JSONDecodeError) else "openai_api")
         error_msg = f"OpenAI API Error: {str(e)}"
         print(f"❌ {error_msg}")
         raise Exception(error_msg)
 
-def create_test_image(original_image_path, lut_instructions, output_path):
-    """Create a test image showing the LUT effect"""
+def get_or_create_lut(lut_instructions, lut_size):
+    """Return the cached LUT for these adjustments, generating it on a miss"""
+    return get_or_create_luts([lut_instructions], lut_size)[0]
+
+def get_or_create_luts(instructions_list, lut_size):
+    """Return a LUT cache entry per instruction set
+    
+    Lookups go to the in-memory cache first, then to the binary sidecar
+    store on disk. The remaining misses are generated together in one
+    stacked pass, and identical adjustments within the list share one entry.
+    Keys another request is already generating are waited for, not
+    generated twice.
+    """
+    keys = [lut_cache_key(instructions, lut_size) for instructions in instructions_list]
+    entries = [lut_cache.get(key) or load_lut_entry(lut_file_for_key(key)) for key in keys]
+    for entry in entries:
+        if entry is not None:
+            print(f"♻️ LUT cache hit: {entry['lut_file']}")
+    
+    missing = {}
+    for index, (key, entry) in enumerate(zip(keys, entries)):
+        if entry is None:
+            missing.setdefault(key, index)
+    if not missing:
+        return entries
+    
+    # Generate only keys no other request is already generating
+    claimed, waiting = {}, {}
+    with lut_inflight_lock:
+        for key, index in missing.items():
+            if key in lut_inflight:
+                waiting[key] = lut_inflight[key]
+            else:
+                claimed[key] = index
+                lut_inflight[key] = threading.Event()
+    generated = {}
     try:
-        img = Image.open(original_image_path)
-        img = img.convert('RGB')
-        
-        # Apply basic adjustments based on LUT instructions
-        adjustments = lut_instructions.get('adjustments', {})
-        
-        # Apply contrast
-        if 'contrast' in adjustments:
-            contrast_val = float(str(adjustments['contrast']).replace('+', ''))
-            if contrast_val != 0:
-                contrast_factor = 1.0 + (contrast_val / 100.0)
-                enhancer = ImageEnhance.Contrast(img)
-                img = enhancer.enhance(contrast_factor)
-        
-        # Apply saturation
-        if 'saturation' in adjustments:
-            sat_val = float(str(adjustments['saturation']).replace('+', ''))
-            if sat_val != 0:
-                sat_factor = 1.0 + (sat_val / 100.0)
-                enhancer = ImageEnhance.Color(img)
-                img = enhancer.enhance(sat_factor)
-        
-        # Apply brightness (approximating exposure)
-        if 'exposure' in adjustments:
-            exp_val = float(str(adjustments['exposure']).replace('+', ''))
-            if exp_val != 0:
-                brightness_factor = 1.0 + (exp_val / 2.0)
-                enhancer = ImageEnhance.Brightness(img)
-                img = enhancer.enhance(brightness_factor)
+        generated.update(generate_luts(claimed, instructions_list, lut_size))
+    finally:
+        with lut_inflight_lock:
+            for key in claimed:
+                lut_inflight.pop(key).set()
+    for key, event in waiting.items():
+        event.wait()
+        entry = lut_cache.get(key) or load_lut_entry(lut_file_for_key(key))
+        if entry is None:
+            # The other request failed; generate it here instead
+            entry = generate_luts({key: missing[key]}, instructions_list, lut_size)[key]
+        else:
+            print(f"♻️ LUT generated concurrently: {entry['lut_file']}")
+        generated[key] = entry
+    return [entry if entry is not None else generated[key] for key, entry in zip(keys, entries)]
+
+def generate_luts(indices_by_key, instructions_list, lut_size):
+    """Generate and store the LUT for each ``{key: index into instructions_list}`` in one stacked pass"""
+    if not indices_by_key:
+        return {}
+    from lut_generator import LUTGenerator
+    generator = LUTGenerator(lut_size=lut_size)
+    indices = list(indices_by_key.values())
+    with metrics.stage("lut_generation"):
+        lattices = generator.generate_lattices([instructions_list[i] for i in indices])
+    generated = {}
+    for key, index, lattice in zip(indices_by_key, indices, lattices):
+        # Copy so the cache holds only this lattice, not the whole stack
+        generated[key] = store_lut(key, lattice.copy(), instructions_list[index])
+    return generated
+
+def store_lut(key, lattice, lut_instructions):
+    """Persist a lattice as a sidecar, add it to the LUT cache and return its entry"""
+    from lut_store import save_lut
+    lut_file = lut_file_for_key(key)
+    os.makedirs("static/luts", exist_ok=True)
+    with metrics.stage("lut_store"):
+        save_lut(sidecar_path(lut_file), lattice, {
+            "key": key,
+            "lut_file": lut_file,
+            "lut_instructions": lut_instructions,
+        }, dtype=app.config["LUT_STORE_DTYPE"])
+    entry = {"key": key, "lut_file": lut_file, "data": None, "lattice": lattice, "lut_instructions": lut_instructions}
+    lut_cache.put(key, entry)
+    return entry
+
+def lut_file_for_key(key):
+    return f"adaptive_lut_{key[:16]}.cube"
+
+def sidecar_path(lut_file):
+    from lut_store import SIDECAR_EXTENSION
+    return f"static/luts/{os.path.splitext(lut_file)[0]}{SIDECAR_EXTENSION}"
+
+def load_lut_entry(lut_file):
+    """Return the entry for ``lut_file`` from the cache or its memory-mapped sidecar"""
+    entry = lut_cache.get_by_name(lut_file)
+    if entry is not None:
+        return entry
+    
+    path = sidecar_path(secure_filename(lut_file))
+    if not os.path.exists(path):
+        return None
+    from lut_store import load_lut
+    lattice, metadata = load_lut(path)
+    entry = {
+        "key": metadata["key"],
+        "lut_file": metadata["lut_file"],
+        "data": None,
+        "lattice": lattice,
+        "lut_instructions": metadata["lut_instructions"],
+    }
+    lut_cache.put(entry["key"], entry)
+    return entry
+
+def cube_bytes(entry):
+    """Return an entry's .cube text, rendering it from the lattice on first use"""
+    if entry.get("data") is None:
+        from lut_generator import LUTGenerator
+        generator = LUTGenerator(lut_size=entry["lattice"].shape[0])
+        with metrics.stage("cube_write"):
+            data = generator.generate_cube_bytes(entry["lut_instructions"], lattice=entry["lattice"]).getvalue()
+        entry = dict(entry, data=data)
+        lut_cache.put(entry["key"], entry)
+    return entry["data"]
+
+def get_lut_pool():
+    """Return the shared LUT process pool when ``APPLY_MODE=process``, else None"""
+    global lut_pool
+    if app.config["APPLY_MODE"] != "process":
+        return None
+    with lut_pool_lock:
+        if lut_pool is None:
+            from lut_pool import LUTProcessPool
+            lut_pool = LUTProcessPool(workers=app.config["APPLY_WORKERS"] or None)
+            print(f"🧵 LUT process pool started with {lut_pool.workers} workers")
+        return lut_pool
+
+def get_uint8_tables():
+    """Return the baked 8-bit table cache when ``PREVIEW_UINT8`` applies, else None"""
+    global uint8_tables
+    if not app.config["PREVIEW_UINT8"] or app.config["PREVIEW_INTERPOLATION"] != "trilinear":
+        return None
+    with lut_pool_lock:
+        if uint8_tables is None:
+            from lut_apply import Uint8TableCache
+            uint8_tables = Uint8TableCache(max_bytes=app.config["UINT8_TABLE_CACHE_BYTES"])
+        return uint8_tables
+
+def grade_image(img, lattice, key=None):
+    """Apply ``lattice`` to a PIL image, on the process pool when configured
+    
+    8-bit previews go through a baked integer table when one is cached or
+    the image is large enough to pay for baking it; otherwise the float
+    path runs.
+    """
+    tables = get_uint8_tables()
+    table = tables.lookup(key, lattice, img.width * img.height) if tables is not None else None
+    pool = get_lut_pool()
+    if table is not None:
+        if pool is not None:
+            return pool.apply_table_to_image(img, table, key=key)
+        import numpy as np
+        from lut_apply import apply_uint8_table
+        return Image.fromarray(apply_uint8_table(np.asarray(img.convert('RGB')), table), 'RGB')
+    if pool is not None:
+        return pool.apply_to_image(img, lattice, method=app.config["PREVIEW_INTERPOLATION"], key=key)
+    from lut_apply import apply_lut_to_image
+    return apply_lut_to_image(img, lattice, method=app.config["PREVIEW_INTERPOLATION"])
+
+def create_preview_variants(prepared, lut_entry):
+    """Render thumbnail and 800px previews as JPEG and WebP, deferring full size
+    
+    The LUT is applied once at 800px and the thumbnail is downscaled from
+    that graded image. Full-size variants only get a recipe here and are
+    rendered on their first GET. Returns ``{variant: {"jpeg": url, "webp":
+    url, "width": .., "height": ..}}`` with content-hashed URLs, or None on
+    failure.
+    """
+    lattice, key = lut_entry["lattice"], lut_entry["key"]
+    try:
+        with metrics.stage("preview_render"):
+            rendered = render_preview_variants(
+                prepared.image, lambda img: grade_image(img, lattice, key=key), variants=EAGER_VARIANTS
+            )
+            saved = save_preview_variants(rendered)
+            saved.update(defer_preview_variants(prepared.raw_bytes, prepared.image.size, lut_entry["lut_file"], key))
+        return {
+            variant: {name: f"/previews/{value}" if name in ("jpeg", "webp") else value for name, value in files.items()}
+            for variant, files in saved.items()
+        }
+    except Exception as e:
+        metrics.error("preview_render")
+        print(f"Preview creation error: {str(e)}")
+        return None
+
+def grade_deferred_preview(img, lut_file):
+    """Grade a deferred preview variant through a stored LUT"""
+    entry = load_lut_entry(lut_file)
+    if entry is None:
+        raise LookupError(f"LUT not found: {lut_file}")
+    return grade_image(img, entry["lattice"], key=entry["key"])
+
+def create_test_image(original_image, lattice, output_path, key=None):
+    """Create a test image showing the LUT effect
+    
+    The preview is rendered through ``lattice``, the same array the .cube
+    file is rendered from. ``original_image`` may be an already decoded
+    PIL image or a file path, and ``output_path`` may be a file object.
+    ``key`` identifies the lattice to the process pool, when one is used.
+    """
+    try:
+        if isinstance(original_image, Image.Image):
+            img = original_image
+        else:
+            img = Image.open(original_image).convert('RGB')
         
         # Resize for web display (max 800px wide)
         if img.width > 800:
@@ -159,6 +581,7 @@ def create_test_image(original_image_path, lut_instructions, output_path):
             new_height = int(img.height * ratio)
             img = img.resize((800, new_height), Image.Resampling.LANCZOS)
         
+        img = grade_image(img, lattice, key=key)
         img.save(output_path, "JPEG", quality=85)
         return output_path
         
@@ -166,6 +589,36 @@ def create_test_image(original_image_path, lut_instructions, output_path):
         print(f"Test image creation error: {str(e)}")
         return None
 
+@app.before_request
+def start_request_timer():
+    metrics.begin_request()
+
+@app.before_request
+def check_upload_size():
+    """Reject bodies over the route's limit before anything reads them
+    
+    Video uploads may be up to ``VIDEO_MAX_BYTES``; everything else keeps
+    the ``UPLOAD_MAX_BYTES`` limit.
+    """
+    limit = app.config["VIDEO_MAX_BYTES"] if request.endpoint == "apply_lut_to_video" else app.config["UPLOAD_MAX_BYTES"]
+    if request.content_length is not None and request.content_length > limit:
+        return jsonify({"error": "Upload too large", "max_bytes": limit}), 413
+
+@app.after_request
+def record_request_metrics(response):
+    """Count the request and its bytes, and attach Server-Timing when enabled"""
+    total, timings = metrics.end_request()
+    endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    metrics.inc("requests_total", {"endpoint": endpoint, "method": request.method, "status": response.status_code})
+    metrics.observe("request_duration_seconds", total, {"endpoint": endpoint})
+    metrics.inc("request_bytes_total", value=request.content_length or 0)
+    metrics.inc("response_bytes_total", value=response.content_length or 0)
+    if response.status_code >= 400:
+        metrics.error(f"http_{response.status_code}")
+    if app.config["SERVER_TIMING"]:
+        response.headers["Server-Timing"] = metrics.server_timing(total, timings)
+    return response
+
 @app.route("/")
 def frontend():
     try:
@@ -181,20 +634,203 @@ def health_check():
         "status": "healthy" if OPENAI_AVAILABLE else "openai_required", 
         "service": "adaptive-lut-app",
         "openai_integration": openai_status,
-        "mode": "real_ai_only" if OPENAI_AVAILABLE else "openai_required"
+        "mode": "real_ai_only" if OPENAI_AVAILABLE else "openai_required",
+        "lut_cache": lut_cache.stats(),
+        "analysis_cache": analysis_cache.stats(),
+        "jobs": job_queue.stats(),
+        "edit_sessions": edit_sessions.stats(),
+        "janitor": janitor.stats(),
+        "apply": dict(lut_pool.stats(), mode="process") if lut_pool is not None else {"mode": app.config["APPLY_MODE"]},
+        "uint8_tables": uint8_tables.stats() if uint8_tables is not None else None
     })
 
+@app.route("/api/metrics")
+def metrics_endpoint():
+    """Counters and latency histograms in the Prometheus text format"""
+    return app.response_class(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+def parse_lut_sizes(value):
+    """Parse a comma-separated list of LUT sizes, validating each one"""
+    sizes = [int(part) for part in str(value).split(",") if part.strip()]
+    if not sizes:
+        raise ValueError("At least one LUT size is required")
+    for size in sizes:
+        if not MIN_LUT_SIZE <= size <= MAX_LUT_SIZE:
+            raise ValueError(f"LUT size must be between {MIN_LUT_SIZE} and {MAX_LUT_SIZE}, got {size}")
+    return sizes
+
+def parse_lut_size(value):
+    """Parse a single LUT size; a comma-separated list is rejected, not truncated"""
+    sizes = parse_lut_sizes(value)
+    if len(sizes) != 1:
+        raise ValueError(f"Expected a single LUT size, got {len(sizes)}; export several sizes with /api/luts/<file>/export")
+    return sizes[0]
+
+def run_lut_pipeline(upload, prompt, lut_size=None, progress=None):
+    """Analyze an upload, build its LUT and preview, and return the response payload
+    
+    ``upload`` is the uploaded image as bytes (or a file object or path);
+    it is decoded once and the same image feeds the analysis and the
+    preview. Raises if the analysis fails. ``progress(event, data)`` is
+    called as each stage finishes: ``analysis``, ``lut`` and ``preview``.
+    """
+    stage = "analysis"
+    try:
+        # Analyze locally when a preset covers the prompt, otherwise with OpenAI
+        print(f"🚀 Starting analysis for: '{prompt}'")
+        prepared = prepare_upload(upload)
+        lut_instructions, analysis = analyze_image(prepared, prompt)
+        source = ANALYSIS_SOURCES[analysis["path"]]
+        print(f"✅ Analysis completed successfully by {source}")
+        
+        stages = {
+            "analysis": {
+                "lut_instructions": lut_instructions,
+                "ai_mode": "local_preset" if analysis["path"] == "local_preset" else "openai_gpt4o_vision",
+                "analysis_type": "local_stats" if analysis["path"] == "local_preset" else "real_ai",
+                "analysis_source": source,
+                "analysis": analysis,
+                "upload_stats": prepared.stats(),
+            }
+        }
+        if progress is not None:
+            progress("analysis", stages["analysis"])
+        
+        # Generate LUT file (or reuse an identical cached one)
+        stage = "lut"
+        lut_entry = get_or_create_lut(lut_instructions, lut_size or app.config["LUT_SIZE"])
+        lut_filename = lut_entry["lut_file"]
+        stages["lut"] = {
+            "download_url": f"/download/lut/{lut_filename}",
+            "lut_file": lut_filename,
+            "lut_size": int(lut_entry["lattice"].shape[0]),
+            "export_url": f"/api/luts/{lut_filename}/export",
+            "adjust_url": f"/api/luts/{lut_filename}/adjust"
+        }
+        start_edit_session(lut_entry, prepared.image)
+        if progress is not None:
+            progress("lut", stages["lut"])
+        
+        # Create preview variants
+        stage = "preview"
+        previews = create_preview_variants(prepared, lut_entry)
+        stages["preview"] = {}
+        if previews:
+            stages["preview"] = {"test_image_url": previews["medium"]["jpeg"], "previews": previews}
+        if progress is not None:
+            progress("preview", stages["preview"])
+        
+        response_data = {
+            "message": f"LUT generated successfully from {source}!",
+            "status": "success",
+        }
+        for data in stages.values():
+            response_data.update(data)
+        return response_data
+        
+    except Exception as e:
+        if stage == "analysis":
+            print(f"❌ OpenAI Analysis Error: {str(e)}")
+            raise
+        print(f"❌ LUT pipeline error in {stage} stage: {str(e)}")
+        raise PipelineStageError(stage, e) from e
+
+class PipelineStageError(Exception):
+    """A pipeline failure after the analysis succeeded, tagged with its stage"""
+    
+    def __init__(self, stage, error):
+        super().__init__(str(error))
+        self.stage = stage
+
+PIPELINE_STAGE_ERRORS = {
+    "lut": "LUT generation failed",
+    "preview": "Preview rendering failed",
+}
+
+def analysis_error_payload(error_message):
+    return {
+        "error": "OpenAI analysis failed",
+        "message": error_message,
+        "ai_mode": "openai_required",
+        "suggestion": "Check your OpenAI API key and internet connection"
+    }
+
+def pipeline_error_payload(error_message, stage=None):
+    """Error payload for a failed pipeline run, naming the stage that failed"""
+    if stage in PIPELINE_STAGE_ERRORS:
+        return {"error": PIPELINE_STAGE_ERRORS[stage], "message": error_message, "stage": stage}
+    return analysis_error_payload(error_message)
+
+STREAM_FORMATS = {"ndjson": "application/x-ndjson", "sse": "text/event-stream"}
+
+def stream_format():
+    """The streaming format a request asked for, via ``stream=`` or its Accept header"""
+    requested = request.form.get("stream")
+    if requested in STREAM_FORMATS:
+        return requested
+    accept = request.headers.get("Accept", "")
+    if "text/event-stream" in accept:
+        return "sse"
+    if "application/x-ndjson" in accept:
+        return "ndjson"
+    return None
+
+def format_stream_event(event, data, fmt):
+    if fmt == "sse":
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+    return json.dumps(dict(data, event=event)) + "\n"
+
+def stream_lut_pipeline(upload, prompt, lut_size, fmt):
+    """Run the pipeline on the job queue and stream its stage events
+    
+    Events are ``queued``, ``analysis``, ``lut``, ``preview`` and finally
+    ``done`` with the full payload, or ``error``. Raises QueueFullError
+    before anything is sent when the queue is full.
+    """
+    events = queue.Queue()
+    
+    def run():
+        try:
+            result = run_lut_pipeline(upload, prompt, lut_size, progress=lambda event, data: events.put((event, data)))
+            events.put(("done", result))
+            return result
+        except Exception as e:
+            events.put(("error", pipeline_error_payload(str(e), getattr(e, "stage", None))))
+            raise
+        finally:
+            events.put(None)
+    
+    job_id = job_queue.submit(run)
+    
+    def generate():
+        yield format_stream_event("queued", {"job_id": job_id, "queue_position": job_queue.position(job_id)}, fmt)
+        while True:
+            try:
+                item = events.get(timeout=STREAM_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                # Keeps proxies from closing an idle connection during a slow analysis
+                yield ": keepalive\n\n" if fmt == "sse" else format_stream_event("keepalive", {}, fmt)
+                continue
+            if item is None:
+                return
+            yield format_stream_event(*item, fmt)
+    
+    response = app.response_class(stream_with_context(generate()), mimetype=STREAM_FORMATS[fmt])
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
 @app.route("/api/process-lut", methods=["POST"])
 def process_lut():
+    """Generate a LUT from an image + prompt
+    
+    With ``mode=job`` in the form data the work is queued and a job id is
+    returned immediately (202); poll ``/api/jobs/<job_id>`` for the result.
+    With ``stream=ndjson`` or ``stream=sse`` (or a matching Accept header)
+    the work is queued the same way and stage results are streamed back
+    as they finish. An optional ``lut_size`` chooses the lattice resolution.
+    """
     try:
-        # Check OpenAI availability first
-        if not OPENAI_AVAILABLE:
-            return jsonify({
-                "error": "OpenAI integration is required for real AI analysis",
-                "message": "This app is configured for OpenAI-only mode. Please check your API key configuration.",
-                "required_action": "Set OPENAI_API_KEY environment variable"
-            }), 503
-        
         if "image" not in request.files:
             return jsonify({"error": "No image file provided"}), 400
         
@@ -203,74 +839,457 @@ def process_lut():
         
         if file.filename == "" or not prompt:
             return jsonify({"error": "Missing file or prompt"}), 400
+        
+        # Prompts a local preset answers work without an API key
+        if not OPENAI_AVAILABLE and needs_openai(prompt):
+            return openai_unavailable_response()
+        
+        try:
+            lut_size = parse_lut_size(request.form.get("lut_size", app.config["LUT_SIZE"]))
+        except ValueError as e:
+            return jsonify({"error": f"Invalid lut_size: {e}"}), 400
             
         if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            # Keep the upload in memory; it never touches static/temp
+            with metrics.stage("upload"):
+                upload = file.stream.read()
             
-            # Save uploaded image
-            upload_path = f"static/temp/upload_{timestamp}_{filename}"
-            file.save(upload_path)
+            fmt = stream_format()
+            if fmt is not None or request.form.get("mode") == "job":
+                try:
+                    if fmt is not None:
+                        return stream_lut_pipeline(upload, prompt, lut_size, fmt)
+                    job_id = job_queue.submit(run_lut_pipeline, upload, prompt, lut_size)
+                except QueueFullError as e:
+                    response = jsonify({"error": "Server busy, please retry shortly", "message": str(e)})
+                    response.headers["Retry-After"] = "5"
+                    return response, 429
+                return jsonify({
+                    "status": "queued",
+                    "job_id": job_id,
+                    "status_url": f"/api/jobs/{job_id}"
+                }), 202
             
             try:
-                # Analyze image with OpenAI (REAL AI ONLY)
-                print(f"🚀 Starting OpenAI analysis for: '{prompt}'")
-                lut_instructions = analyze_image_with_openai(upload_path, prompt)
-                print(f"✅ OpenAI analysis completed successfully")
-                
-                # Generate LUT file
-                from lut_generator import create_lut_from_json
-                lut_filename = f"adaptive_lut_{timestamp}.cube"
-                lut_path = f"static/luts/{lut_filename}"
-                cube_file_path = create_lut_from_json(lut_instructions, output_path=lut_path)
-                
-                # Create test image
-                test_image_filename = f"test_result_{timestamp}.jpg"
-                test_image_path = f"static/temp/{test_image_filename}"
-                test_image_created = create_test_image(upload_path, lut_instructions, test_image_path)
-                
-                response_data = {
-                    "message": "LUT generated successfully with OpenAI analysis!",
-                    "lut_instructions": lut_instructions,
-                    "download_url": f"/download/lut/{lut_filename}",
-                    "lut_file": lut_filename,
-                    "status": "success",
-                    "ai_mode": "openai_gpt4o_vision",
-                    "analysis_type": "real_ai"
-                }
-                
-                if test_image_created:
-                    response_data["test_image_url"] = f"/static/temp/{test_image_filename}"
-                
-                return jsonify(response_data)
-                
+                return jsonify(run_lut_pipeline(upload, prompt, lut_size))
             except Exception as e:
-                error_message = str(e)
-                print(f"❌ OpenAI Analysis Error: {error_message}")
-                
-                # Clean up uploaded file
-                try:
-                    os.remove(upload_path)
-                except:
-                    pass
-                
-                return jsonify({
-                    "error": "OpenAI analysis failed",
-                    "message": error_message,
-                    "ai_mode": "openai_required",
-                    "suggestion": "Check your OpenAI API key and internet connection"
-                }), 500
+                return jsonify(pipeline_error_payload(str(e), getattr(e, "stage", None))), 500
         else:
             return jsonify({"error": "Invalid file type. Please upload JPEG or PNG images."}), 400
             
     except Exception as e:
         return jsonify({"error": f"Processing error: {str(e)}"}), 500
 
+@app.route("/api/process-lut/batch", methods=["POST"])
+def process_lut_batch():
+    """Grade every combination of the uploaded images and prompts
+    
+    Accepts one or more ``images`` files and one or more ``prompts`` fields
+    (``image``/``prompt`` work too). Analyses run concurrently under the
+    batch rate limit, all LUTs are generated in one stacked pass, and the
+    response is a ZIP of .cube files, previews and a ``manifest.json``
+    recording each item's outcome. Failed items are reported in the manifest
+    instead of failing the batch.
+    """
+    files = [f for f in request.files.getlist("images") + request.files.getlist("image") if f.filename]
+    prompts = [p.strip() for p in request.form.getlist("prompts") + request.form.getlist("prompt") if p.strip()]
+    if not files or not prompts:
+        return jsonify({"error": "Provide at least one image and one prompt"}), 400
+    if len(files) * len(prompts) > app.config["BATCH_MAX_ITEMS"]:
+        return jsonify({"error": f"Batch too large: at most {app.config['BATCH_MAX_ITEMS']} image/prompt combinations"}), 400
+    # Items whose prompts need OpenAI fail individually in the manifest
+    if not OPENAI_AVAILABLE and all(needs_openai(prompt) for prompt in prompts):
+        return openai_unavailable_response()
+    
+    images = []
+    for file in files:
+        name = secure_filename(file.filename)
+        if not allowed_file(file.filename):
+            images.append((name, None, "Invalid file type. Please upload JPEG or PNG images."))
+            continue
+        try:
+            images.append((name, prepare_upload(file.stream.read()), None))
+        except Exception as e:
+            images.append((name, None, f"Could not decode image: {e}"))
+    
+    items = [
+        {"image": name, "prompt": prompt, "prepared": prepared, "error": error}
+        for name, prepared, error in images
+        for prompt in prompts
+    ]
+    
+    def analyze(item):
+        try:
+            item["lut_instructions"], item["analysis"] = analyze_image(
+                item["prepared"], item["prompt"], rate_limiter=batch_rate_limiter
+            )
+        except Exception as e:
+            item["error"] = str(e)
+    
+    pending = [item for item in items if item["error"] is None]
+    print(f"📦 Batch: {len(items)} items, {len(pending)} to analyze")
+    with ThreadPoolExecutor(max_workers=app.config["BATCH_CONCURRENCY"]) as executor:
+        list(executor.map(analyze, pending))
+    
+    succeeded = [item for item in items if item["error"] is None]
+    if succeeded:
+        entries = get_or_create_luts([item["lut_instructions"] for item in succeeded], app.config["LUT_SIZE"])
+        for item, entry in zip(succeeded, entries):
+            item["lut_entry"] = entry
+    
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    archive = io.BytesIO()
+    manifest = []
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        for index, item in enumerate(items, start=1):
+            stem = f"{index:02d}_{os.path.splitext(item['image'])[0]}_{secure_filename(item['prompt'])[:40]}"
+            record = {"index": index, "image": item["image"], "prompt": item["prompt"]}
+            if item["error"] is not None:
+                record.update({"status": "error", "error": item["error"]})
+                manifest.append(record)
+                continue
+            
+            entry = item["lut_entry"]
+            zf.writestr(f"{stem}.cube", cube_bytes(entry))
+            record.update({
+                "status": "success",
+                "lut_file": f"{stem}.cube",
+                "download_url": f"/download/lut/{entry['lut_file']}",
+                "lut_instructions": item["lut_instructions"],
+                "analysis_path": item["analysis"]["path"],
+            })
+            preview = io.BytesIO()
+            if create_test_image(item["prepared"].image, entry["lattice"], preview, key=entry["key"]):
+                zf.writestr(f"{stem}_preview.jpg", preview.getvalue())
+                record["preview_file"] = f"{stem}_preview.jpg"
+            manifest.append(record)
+        zf.writestr("manifest.json", json.dumps({"items": manifest}, indent=2))
+    
+    if not succeeded:
+        return jsonify({"error": "All batch items failed", "items": manifest}), 500
+    
+    archive.seek(0)
+    return send_file(archive, mimetype="application/zip", as_attachment=True, download_name=f"adaptive_luts_{timestamp}.zip")
+
+@app.route("/api/jobs/<job_id>")
+def job_status(job_id):
+    """Report the status of a queued LUT job, including its result when done"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    
+    payload = {"job_id": job_id, "kind": job["kind"], "status": job["status"]}
+    if job["status"] == "queued":
+        payload["queue_position"] = job_queue.position(job_id)
+    elif job["status"] == "succeeded":
+        payload["result"] = job["result"]
+    elif job["status"] == "failed" and job["kind"] == "video":
+        payload.update({"error": "Video processing failed", "message": job["error"]})
+    elif job["status"] == "failed":
+        payload.update(pipeline_error_payload(job["error"], job["error_stage"]))
+    if job["finished_at"] is not None:
+        payload["duration_seconds"] = round(job["finished_at"] - job["submitted_at"], 3)
+    return jsonify(payload)
+
+def start_edit_session(entry, image):
+    """Remember a small proxy of ``image`` so tweaks of ``entry`` can preview quickly"""
+    session = edit_sessions.get(entry["lut_file"]) or {}
+    edit_sessions.put(entry["lut_file"], {
+        "lut_instructions": entry["lut_instructions"],
+        "lut_size": int(entry["lattice"].shape[0]),
+        "checkpoints": session.get("checkpoints"),
+        "proxy": make_proxy(image, app.config["ADJUST_PROXY_EDGE"]),
+    })
+
+@app.route("/api/luts/<lut_file>/adjust", methods=["POST"])
+def adjust_lut(lut_file):
+    """Nudge a generated LUT's parameters without another AI analysis
+    
+    Takes a JSON body ``{"deltas": {"saturation": 10, "color_wheels":
+    {"shadows": {"blue": 0.1}}}}``, or form data with ``deltas`` as a JSON
+    string and an optional ``image`` to preview on. Only the stages from
+    the first changed one onwards are recomputed, using the checkpoints
+    kept from earlier tweaks. The new LUT is stored like any other, and a
+    low-resolution preview is graded from the session's cached proxy.
+    """
+    entry = load_lut_entry(lut_file)
+    if entry is None:
+        return jsonify({"error": "LUT not found"}), 404
+    if "adjustments" not in entry["lut_instructions"]:
+        return jsonify({"error": "Only LUTs generated from adjustments can be tweaked"}), 400
+    
+    try:
+        if request.is_json:
+            deltas = (request.get_json(silent=True) or {}).get("deltas")
+        else:
+            deltas = json.loads(request.form.get("deltas", "null"))
+        if not isinstance(deltas, dict) or not deltas:
+            raise ValueError("deltas must be a non-empty object")
+        lut_instructions = apply_deltas(entry["lut_instructions"], deltas)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid deltas: {e}"}), 400
+    
+    session = edit_sessions.get(lut_file) or {}
+    proxy = session.get("proxy")
+    if "image" in request.files and allowed_file(request.files["image"].filename):
+        proxy = make_proxy(prepare_upload(request.files["image"].stream.read()).image, app.config["ADJUST_PROXY_EDGE"])
+    
+    from lut_generator import LUTGenerator
+    lut_size = int(entry["lattice"].shape[0])
+    checkpoints = session.get("checkpoints") if session.get("lut_size") == lut_size else None
+    with metrics.stage("lut_adjust"):
+        lattice, checkpoints, reused = LUTGenerator(lut_size=lut_size).generate_lattice_incremental(lut_instructions, checkpoints)
+    key = lut_cache_key(lut_instructions, lut_size)
+    new_entry = lut_cache.get(key) or load_lut_entry(lut_file_for_key(key)) or store_lut(key, lattice, lut_instructions)
+    
+    new_session = {"lut_instructions": lut_instructions, "lut_size": lut_size, "checkpoints": checkpoints, "proxy": proxy}
+    edit_sessions.put(new_entry["lut_file"], new_session)
+    if new_entry["lut_file"] != lut_file:
+        # Later tweaks of the original LUT can share the new checkpoints too
+        edit_sessions.put(lut_file, dict(session, lut_instructions=entry["lut_instructions"], lut_size=lut_size, checkpoints=checkpoints, proxy=proxy))
+    
+    new_file = new_entry["lut_file"]
+    payload = {
+        "status": "success",
+        "lut_instructions": lut_instructions,
+        "lut_file": new_file,
+        "download_url": f"/download/lut/{new_file}",
+        "export_url": f"/api/luts/{new_file}/export",
+        "adjust_url": f"/api/luts/{new_file}/adjust",
+        "lut_size": lut_size,
+        "reused_stages": reused,
+    }
+    if proxy is not None:
+        with metrics.stage("adjust_preview"):
+            preview = encode_proxy_preview(grade_image(proxy, lattice))
+        payload["preview"] = "data:image/jpeg;base64," + base64.b64encode(preview).decode("ascii")
+    return jsonify(payload)
+
+@app.route("/api/luts/<lut_file>/export")
+def export_lut(lut_file):
+    """Export a generated LUT at several sizes and formats as a ZIP
+    
+    Query parameters: ``sizes`` (comma-separated, default 17,33,65) and
+    ``formats`` (any of cube, 3dl, hald, shaper_cube; default cube). The
+    transform is computed once at the largest size and resampled.
+    """
+    entry = load_lut_entry(lut_file)
+    if entry is None:
+        return jsonify({"error": "LUT not found"}), 404
+    
+    try:
+        sizes = parse_lut_sizes(request.args.get("sizes", "17,33,65"))
+        formats = [f.strip() for f in request.args.get("formats", "cube").split(",") if f.strip()]
+        from lut_export import export_luts
+        instructions = entry["lut_instructions"]
+        files = export_luts(
+            instructions, sizes, formats,
+            basename=os.path.splitext(lut_file)[0],
+            lattice=None if "adjustments" in instructions else entry["lattice"],
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in files.items():
+            zf.writestr(name, data)
+    archive.seek(0)
+    return send_file(archive, mimetype="application/zip", as_attachment=True, download_name=f"{os.path.splitext(lut_file)[0]}_export.zip")
+
+def run_video_pipeline(lattice, source_path, timestamp, method, is_sequence=False):
+    """Grade an uploaded video, or a ZIP of frames, through ``lattice``
+    
+    Returns the output URL and the run statistics. Work happens in the
+    staging directory, which the janitor never sweeps; only the finished
+    output is moved into static/temp. The upload and any extracted frames
+    are removed afterwards.
+    """
+    from video_lut import IMAGE_EXTENSIONS, apply_lut_to_stream
+    staging = app.config["VIDEO_STAGING_DIRECTORY"]
+    work_dir = f"{staging}/frames_{timestamp}"
+    output_name = f"graded_{timestamp}.{'zip' if is_sequence else 'mp4'}"
+    staged_output = f"{staging}/{output_name}"
+    try:
+        if not is_sequence:
+            stats = apply_lut_to_stream(
+                source_path, staged_output, lattice, method=method,
+                batch_frames=app.config["VIDEO_BATCH_FRAMES"], fourcc=app.config["VIDEO_FOURCC"], pool=get_lut_pool(),
+            )
+        else:
+            # Frames are extracted under index-based names, never archive paths
+            os.makedirs(f"{work_dir}/in", exist_ok=True)
+            with zipfile.ZipFile(source_path) as zf:
+                members = sorted(
+                    name for name in zf.namelist()
+                    if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+                )
+                for index, name in enumerate(members):
+                    with open(f"{work_dir}/in/{index:06d}{os.path.splitext(name)[1].lower()}", "wb") as f:
+                        f.write(zf.read(name))
+            stats = apply_lut_to_stream(
+                f"{work_dir}/in", f"{work_dir}/out", lattice, method=method,
+                batch_frames=app.config["VIDEO_BATCH_FRAMES"], pool=get_lut_pool(),
+            )
+            with zipfile.ZipFile(staged_output, "w", zipfile.ZIP_STORED) as zf:
+                for name in sorted(os.listdir(f"{work_dir}/out")):
+                    zf.write(f"{work_dir}/out/{name}", name)
+        os.replace(staged_output, f"static/temp/{output_name}")
+        print(f"🎬 Graded {stats['frames']} frames at {stats['fps']} fps (peak RSS {stats['peak_rss_mb']} MB)")
+        return {"status": "success", "output_url": f"/static/temp/{output_name}", "stats": stats}
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        for path in (source_path, staged_output):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+@app.route("/api/luts/<lut_file>/apply-video", methods=["POST"])
+def apply_lut_to_video(lut_file):
+    """Queue a generated LUT to be applied to a video or an image sequence
+    
+    Upload ``video`` (mp4, mov, avi, mkv, m4v, webm) or ``frames`` (a ZIP of
+    images, graded in name order). An optional ``method`` picks trilinear
+    or tetrahedral interpolation. Returns 202 with a job to poll; the result
+    holds the graded file's URL plus frames/sec and peak RSS for the run.
+    """
+    entry = load_lut_entry(lut_file)
+    if entry is None:
+        return jsonify({"error": "LUT not found"}), 404
+    
+    upload = request.files.get("video") or request.files.get("frames")
+    if upload is None or not upload.filename:
+        return jsonify({"error": "Upload a 'video' file or a 'frames' ZIP"}), 400
+    is_sequence = "video" not in request.files
+    extension = upload.filename.rsplit(".", 1)[-1].lower() if "." in upload.filename else ""
+    if is_sequence and extension != "zip":
+        return jsonify({"error": "Frames must be uploaded as a ZIP of images"}), 400
+    if not is_sequence and extension not in VIDEO_UPLOAD_EXTENSIONS:
+        return jsonify({"error": f"Unsupported video type: {extension or 'none'}"}), 400
+    method = request.form.get("method", app.config["PREVIEW_INTERPOLATION"])
+    if method not in ("trilinear", "tetrahedral"):
+        return jsonify({"error": f"Unknown interpolation method: {method}"}), 400
+    
+    timestamp = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    # Staged outside static/temp so the janitor cannot evict a queued upload
+    source_path = f"{app.config['VIDEO_STAGING_DIRECTORY']}/video_{timestamp}_{secure_filename(upload.filename)}"
+    upload.save(source_path)
+    try:
+        job_id = job_queue.submit(
+            run_video_pipeline, entry["lattice"], source_path, timestamp, method, is_sequence, kind="video"
+        )
+    except QueueFullError as e:
+        os.remove(source_path)
+        response = jsonify({"error": "Server busy, please retry shortly", "message": str(e)})
+        response.headers["Retry-After"] = "5"
+        return response, 429
+    return jsonify({
+        "status": "queued",
+        "job_id": job_id,
+        "status_url": f"/api/jobs/{job_id}"
+    }), 202
+
+def resolve_lut_input(name, data):
+    """Load LUT operand ``name`` from an uploaded .cube or a generated LUT file name
+    
+    Returns ``(lattice, token, title)`` where ``token`` identifies the
+    operand's content for cache keys.
+    """
+    upload = request.files.get(f"{name}_file")
+    if upload is not None and upload.filename:
+        from lut_generator import parse_cube
+        raw = upload.read()
+        lattice, metadata = parse_cube(raw, max_size=MAX_LUT_SIZE)
+        return lattice, hashlib.sha256(raw).hexdigest(), metadata["title"] or upload.filename
+    
+    lut_file = data.get(name)
+    if not lut_file:
+        raise ValueError(f"Missing LUT '{name}': pass a generated LUT file name or upload {name}_file")
+    entry = load_lut_entry(lut_file)
+    if entry is None:
+        raise LookupError(f"LUT not found: {lut_file}")
+    return entry["lattice"], entry["key"], entry["lut_instructions"].get("base_style", lut_file)
+
+@app.route("/api/luts/compose", methods=["POST"])
+def compose_lut():
+    """Combine LUTs with array operations and store the result like a generated LUT
+    
+    Fields (form or JSON): ``operation`` is ``compose`` (apply ``b`` then
+    ``a``), ``blend`` (mix ``a`` towards ``b`` by ``amount`` percent) or
+    ``scale`` (``a`` at ``amount`` percent intensity). Operands are generated
+    LUT file names in ``a``/``b`` or uploaded .cube files in
+    ``a_file``/``b_file``. ``lut_size`` optionally sets the output size.
+    """
+    from lut_generator import blend_luts, compose_luts, resample_lattice, scale_lut
+    data = request.get_json(silent=True) or request.form
+    operation = data.get("operation", "compose")
+    if operation not in ("compose", "blend", "scale"):
+        return jsonify({"error": f"Unknown operation: {operation}"}), 400
+    
+    try:
+        amount = float(data.get("amount", 100)) / 100.0
+        size = parse_lut_size(data["lut_size"]) if data.get("lut_size") else None
+        a, a_token, a_title = resolve_lut_input("a", data)
+        b, b_token, b_title = resolve_lut_input("b", data) if operation != "scale" else (None, None, None)
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    if operation == "scale":
+        size = size or a.shape[0]
+        title = f"{a_title} @ {amount * 100:g}%"
+    else:
+        size = size or max(a.shape[0], b.shape[0])
+        title = f"{a_title} ∘ {b_title}" if operation == "compose" else f"{a_title} / {b_title} blend {amount * 100:g}%"
+    
+    payload = json.dumps({
+        "operation": operation,
+        "a": a_token,
+        "b": b_token,
+        "amount": amount,
+        "lut_size": size,
+    }, sort_keys=True)
+    key = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    entry = lut_cache.get(key) or load_lut_entry(lut_file_for_key(key))
+    if entry is None:
+        if operation == "scale":
+            lattice = scale_lut(resample_lattice(a, size), amount)
+        elif operation == "compose":
+            lattice = compose_luts(a, b, size=size)
+        else:
+            lattice = blend_luts(a, b, amount, size=size)
+        entry = store_lut(key, lattice, {
+            "base_style": title,
+            "description": f"{operation.capitalize()} of LUTs by Adaptive LUT",
+        })
+    
+    lut_filename = entry["lut_file"]
+    return jsonify({
+        "message": f"LUT {operation} complete",
+        "status": "success",
+        "operation": operation,
+        "title": title,
+        "lut_file": lut_filename,
+        "lut_size": int(entry["lattice"].shape[0]),
+        "download_url": f"/download/lut/{lut_filename}",
+        "export_url": f"/api/luts/{lut_filename}/export"
+    })
+
 @app.route("/download/lut/<filename>")
 def download_lut(filename):
-    """Download LUT file"""
+    """Download LUT file
+    
+    Generated LUTs are stored as binary sidecars; their .cube text is
+    rendered on the first download and then served from the LUT cache.
+    """
     try:
-        lut_path = f"static/luts/{filename}"
+        entry = load_lut_entry(filename)
+        if entry is not None:
+            return send_file(io.BytesIO(cube_bytes(entry)), as_attachment=True, download_name=filename, mimetype='application/octet-stream')
+        
+        lut_path = f"static/luts/{secure_filename(filename)}"
         if os.path.exists(lut_path):
             return send_file(lut_path, as_attachment=True, download_name=filename, mimetype='application/octet-stream')
         else:
@@ -278,14 +1297,45 @@ def download_lut(filename):
     except Exception as e:
         return jsonify({"error": f"Download error: {str(e)}"}), 500
 
+@app.route("/previews/<filename>")
+def serve_preview(filename):
+    """Serve a content-hashed preview with a strong ETag, cacheable forever
+    
+    The name embeds a hash of the file's content, so a matching
+    ``If-None-Match`` is answered with 304 without touching the disk.
+    Deferred full-size variants are rendered on their first request.
+    """
+    filename = secure_filename(filename)
+    extension = os.path.splitext(filename)[1].lstrip(".")
+    if extension not in FORMAT_MIMETYPES:
+        return jsonify({"error": "Preview not found"}), 404
+    etag = etag_for(filename)
+    max_age = 365 * 24 * 3600
+    
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        path = os.path.join(PREVIEW_DIRECTORY, filename)
+        if not os.path.exists(path):
+            try:
+                with metrics.stage("preview_render"):
+                    path = render_deferred_preview(filename, grade_deferred_preview)
+            except LookupError:
+                path = None
+            if path is None:
+                return jsonify({"error": "Preview not found"}), 404
+        response = send_file(os.path.abspath(path), mimetype=FORMAT_MIMETYPES[extension], conditional=False, etag=False, max_age=max_age)
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    response.cache_control.immutable = True
+    return response
+
 @app.route("/static/<path:filename>")
 def serve_static(filename):
     return send_from_directory("static", filename)
 
 if __name__ == "__main__":
-    os.makedirs("static", exist_ok=True)
-    os.makedirs("static/temp", exist_ok=True)
-    os.makedirs("static/luts", exist_ok=True)
     port = int(os.environ.get("PORT", 5000))
     print(f"🎨 Adaptive LUT Server starting on port {port}")
     print(f"📁 Static files directory: {os.path.abspath('static')}")
@@ -295,4 +1345,5 @@ if __name__ == "__main__":
     else:
         print(f"❌ AI Mode: OpenAI Required - App will not process images without API key")
         print(f"🔧 Please set OPENAI_API_KEY in your .env file")
-    app.run(host="0.0.0.0", port=port, debug=True)
+    # Development server only; production runs gunicorn -c gunicorn.conf.py app:app
+    app.run(host="0.0.0.0", port=port, debug=os.environ.get("FLASK_DEBUG", "1") == "1")
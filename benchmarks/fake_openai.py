@@ -0,0 +1,170 @@
+"""Stand-ins for the OpenAI chat completions API, for load tests and benchmarks.
+
+``FakeOpenAIServer`` answers POST /v1/chat/completions over HTTP, so the app
+can be driven end to end through the real SDK; point the app at it with
+OPENAI_BASE_URL=http://127.0.0.1:<port>/v1. ``FakeOpenAIClient`` is an
+in-process object with the same ``chat.completions.create`` shape, for
+passing as ``client=`` to ``analyze_image_with_openai``.
+
+Both wait ``latency`` seconds (plus up to ``jitter``) and then reply in
+one of these modes:
+
+- ``canned``: valid grading instructions
+- ``varied``: valid instructions that differ on every call (defeats caches)
+- ``malformed``: prose with no JSON in it
+- ``truncated``: JSON cut off half way
+- ``error``: an HTTP 500 API error
+
+``malformed_rate`` mixes malformed replies into any other mode.
+"""
+import copy
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+MODES = ("canned", "varied", "malformed", "truncated", "error")
+
+CANNED_INSTRUCTIONS = {
+    "base_style": "Warm cinematic",
+    "description": "Canned response from the fake OpenAI server",
+    "adjustments": {
+        "temperature": "+20",
+        "tint": "-5",
+        "exposure": "0.2",
+        "contrast": "+15",
+        "highlights": "-10",
+        "shadows": "+10",
+        "whites": "0",
+        "blacks": "-5",
+        "saturation": "+10",
+        "vibrance": "+15",
+    },
+    "color_wheels": {
+        "shadows": {"red": 0.0, "green": 0.05, "blue": 0.2},
+        "midtones": {"red": 0.1, "green": 0.0, "blue": -0.05},
+        "highlights": {"red": 0.2, "green": 0.1, "blue": -0.1},
+    },
+}
+
+
+def completion(content, model="gpt-4o"):
+    return {
+        "id": "chatcmpl-fake",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+class FakeBackend:
+    """Latency, reply mode and call counting shared by the server and the client"""
+
+    def __init__(self, latency=0.0, jitter=0.0, mode="canned", malformed_rate=0.0, seed=0):
+        if mode not in MODES:
+            raise ValueError(f"Unknown fake OpenAI mode: {mode}")
+        self.latency = latency
+        self.jitter = jitter
+        self.mode = mode
+        self.malformed_rate = malformed_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def reply(self):
+        """Sleep for the configured latency, then return (mode, content)"""
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+            delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0.0)
+            mode = "malformed" if self._random.random() < self.malformed_rate else self.mode
+        if delay:
+            time.sleep(delay)
+
+        if mode == "malformed":
+            return mode, "I'm sorry, I can't provide color grading values for this image."
+        if mode == "error":
+            return mode, None
+        instructions = CANNED_INSTRUCTIONS
+        if mode == "varied":
+            instructions = copy.deepcopy(CANNED_INSTRUCTIONS)
+            instructions["adjustments"]["temperature"] = str(call % 200 - 100)
+        content = json.dumps(instructions)
+        if mode == "truncated":
+            content = content[:len(content) // 2]
+        return mode, content
+
+
+class FakeOpenAIServer:
+    """Threaded HTTP server answering chat completions like the OpenAI API"""
+
+    def __init__(self, latency=0.0, jitter=0.0, mode="canned", malformed_rate=0.0, host="127.0.0.1", port=0):
+        self.backend = FakeBackend(latency=latency, jitter=jitter, mode=mode, malformed_rate=malformed_rate)
+        backend = self.backend
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                mode, content = backend.reply()
+                if mode == "error":
+                    status = 500
+                    payload = {"error": {"message": "The fake server had an error", "type": "server_error", "code": None}}
+                else:
+                    status = 200
+                    payload = completion(content, body.get("model", "gpt-4o"))
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def requests(self):
+        return self.backend.calls
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class FakeOpenAIClient:
+    """In-process object with the ``client.chat.completions.create`` interface"""
+
+    def __init__(self, latency=0.0, jitter=0.0, mode="canned", malformed_rate=0.0):
+        self.backend = FakeBackend(latency=latency, jitter=jitter, mode=mode, malformed_rate=malformed_rate)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model="gpt-4o", **kwargs):
+        mode, content = self.backend.reply()
+        if mode == "error":
+            raise RuntimeError("Error code: 500 - The fake client had an error")
+        message = SimpleNamespace(role="assistant", content=content)
+        return SimpleNamespace(model=model, choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")])
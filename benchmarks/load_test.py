@@ -0,0 +1,217 @@
+"""Load-test the production server against a fake OpenAI backend.
+
+Starts benchmarks.fake_openai in-process, launches gunicorn with
+gunicorn.conf.py (or the Flask dev server) in a scratch directory, and
+fires concurrent /api/process-lut requests at it. A few ``mode=job``
+requests are then polled through /api/jobs/<id> to check that job state
+survives the worker layout. Run from the repository root:
+
+    python -m benchmarks.load_test --requests 200 --concurrency 16 --latency 0.5
+"""
+import argparse
+import http.client
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+from PIL import Image
+
+from benchmarks.fake_openai import FakeOpenAIServer
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def sample_jpeg(size=(1600, 1067)):
+    img = Image.linear_gradient("L").resize(size).convert("RGB")
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, data, mimetype) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: {mimetype}\r\n\r\n'.encode() + data + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def wait_until_ready(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=2)
+            connection.request("GET", "/api/health")
+            if connection.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not become ready")
+
+
+def start_server(args, workdir, env):
+    if args.server == "gunicorn":
+        command = [
+            sys.executable, "-m", "gunicorn", "-c", os.path.join(REPO_ROOT, "gunicorn.conf.py"),
+            "--chdir", workdir, "--pythonpath", REPO_ROOT,
+            "--workers", str(args.workers), "--threads", str(args.threads),
+            "--access-logfile", "/dev/null", "app:app",
+        ]
+    else:
+        command = [sys.executable, os.path.join(REPO_ROOT, "app.py")]
+        env["FLASK_DEBUG"] = "0"
+    return subprocess.Popen(command, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def run_load(port, total, concurrency, image, same_prompt):
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker():
+        connection = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+        while True:
+            with lock:
+                index = next(counter, None)
+            if index is None:
+                break
+            prompt = "warm cinematic" if same_prompt else f"warm cinematic #{index}"
+            body, content_type = multipart({"prompt": prompt}, {"image": ("sample.jpg", image, "image/jpeg")})
+            start = time.perf_counter()
+            try:
+                connection.request("POST", "/api/process-lut", body=body, headers={"Content-Type": content_type})
+                response = connection.getresponse()
+                response.read()
+                status = response.status
+            except OSError as e:
+                connection.close()
+                connection = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+                status = str(e)
+            elapsed = time.perf_counter() - start
+            with lock:
+                if status == 200:
+                    latencies.append(elapsed)
+                else:
+                    errors.append(status)
+        connection.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, latencies, errors
+
+
+def request_json(port, method, path, body=None, headers=None, timeout=120):
+    """One request on a fresh connection, as separate browser requests arrive"""
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=timeout)
+    try:
+        connection.request(method, path, body=body, headers=headers or {})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+def run_job_polls(port, count, image, timeout=120):
+    """Queue ``count`` jobs and poll each to completion; return (succeeded, failures)"""
+    succeeded, failures = 0, []
+    for index in range(count):
+        body, content_type = multipart({"prompt": f"job poll #{index}", "mode": "job"}, {"image": ("sample.jpg", image, "image/jpeg")})
+        status, payload = request_json(port, "POST", "/api/process-lut", body, {"Content-Type": content_type})
+        if status != 202:
+            failures.append(f"submit HTTP {status}")
+            continue
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            status, job = request_json(port, "GET", payload["status_url"])
+            if status != 200:
+                failures.append(f"poll HTTP {status}")
+                break
+            if job["status"] == "succeeded":
+                succeeded += 1
+                break
+            if job["status"] == "failed":
+                failures.append("job failed")
+                break
+            time.sleep(0.1)
+        else:
+            failures.append("poll timeout")
+    return succeeded, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.5, help="fake OpenAI response delay in seconds")
+    parser.add_argument("--server", choices=("gunicorn", "dev"), default="gunicorn")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--jobs", type=int, default=10, help="mode=job requests to submit and poll afterwards")
+    parser.add_argument("--port", type=int, default=5077)
+    parser.add_argument("--same-prompt", action="store_true", help="repeat one prompt so analyses hit the cache")
+    args = parser.parse_args()
+
+    fake = FakeOpenAIServer(latency=args.latency).start()
+    workdir = tempfile.mkdtemp(prefix="lut-load-")
+    os.makedirs(os.path.join(workdir, "static"), exist_ok=True)
+    env = dict(
+        os.environ,
+        PORT=str(args.port),
+        OPENAI_API_KEY="fake-key",
+        OPENAI_BASE_URL=fake.base_url,
+        PYTHONPATH=REPO_ROOT,
+        JANITOR_INTERVAL="0",
+    )
+    server = start_server(args, workdir, env)
+    try:
+        startup = time.perf_counter()
+        wait_until_ready(args.port)
+        print(f"Server ready in {time.perf_counter() - startup:.2f}s ({args.server}, "
+              f"{args.workers} workers x {args.threads} threads)")
+        seconds, latencies, errors = run_load(args.port, args.requests, args.concurrency, sample_jpeg(), args.same_prompt)
+        jobs_ok, job_failures = run_job_polls(args.port, args.jobs, sample_jpeg())
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        fake.stop()
+
+    print(f"{len(latencies)} ok, {len(errors)} failed in {seconds:.2f}s "
+          f"-> {len(latencies) / seconds:.1f} req/s at concurrency {args.concurrency}")
+    print(f"latency p50 {percentile(latencies, 0.5) * 1000:.0f} ms, "
+          f"p95 {percentile(latencies, 0.95) * 1000:.0f} ms, p99 {percentile(latencies, 0.99) * 1000:.0f} ms")
+    print(f"fake OpenAI calls: {fake.requests} (latency {args.latency}s)")
+    if errors:
+        print(f"errors: {sorted(set(map(str, errors)))}")
+    if args.jobs:
+        print(f"job polls: {jobs_ok} of {args.jobs} succeeded")
+    if job_failures:
+        print(f"job poll failures: {sorted(set(job_failures))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""End-to-end latency benchmark suite with machine-readable results.
+
+Measures LUT generation and .cube rendering at each size, preview
+rendering, the vision analysis with cache misses and hits, and the full
+/api/process-lut request path against benchmarks.fake_openai. Latency
+percentiles and throughput are printed and written as JSON. Run from the
+repository root:
+
+    python -m benchmarks.suite                         # writes benchmarks/results/<timestamp>.json
+    python -m benchmarks.suite --quick --compare benchmarks/results/baseline.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+from PIL import Image
+
+from benchmarks.fake_openai import FakeOpenAIClient, FakeOpenAIServer
+from benchmarks.load_test import REPO_ROOT, percentile, sample_jpeg
+from benchmarks.lut_generation import SAMPLE_INSTRUCTIONS
+from lut_apply import apply_lut_to_image
+from lut_generator import LUTGenerator
+from previews import render_preview_variants
+
+SIZES = (17, 33, 65)
+RESULTS_DIRECTORY = os.path.join(REPO_ROOT, "benchmarks", "results")
+
+
+def summarize(durations, seconds=None, errors=0):
+    """Latency percentiles in milliseconds, plus throughput when ``seconds`` is given"""
+    summary = {
+        "count": len(durations),
+        "errors": errors,
+        "mean_ms": round(float(np.mean(durations)) * 1000, 3) if durations else 0.0,
+        "p50_ms": round(percentile(durations, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(durations, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(durations, 0.99) * 1000, 3),
+    }
+    if seconds:
+        summary["throughput_rps"] = round(len(durations) / seconds, 2)
+    return summary
+
+
+def time_calls(fn, repeat):
+    durations = []
+    for index in range(repeat):
+        start = time.perf_counter()
+        fn(index)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def bench_lut_generation(repeat):
+    results = {}
+    for size in SIZES:
+        generator = LUTGenerator(lut_size=size)
+        lattice = generator.generate_lattice(SAMPLE_INSTRUCTIONS)
+        results[f"lut_generate_{size}"] = summarize(time_calls(lambda _: generator.generate_lattice(SAMPLE_INSTRUCTIONS), repeat))
+        results[f"cube_render_{size}"] = summarize(
+            time_calls(lambda _: generator.generate_cube_bytes(SAMPLE_INSTRUCTIONS, lattice=lattice), repeat)
+        )
+    return results
+
+
+def bench_previews(repeat):
+    lattice = LUTGenerator(lut_size=33).generate_lattice(SAMPLE_INSTRUCTIONS)
+    image = Image.open(io.BytesIO(sample_jpeg())).convert("RGB")
+    return {
+        "preview_variants": summarize(time_calls(
+            lambda _: render_preview_variants(image, lambda img: apply_lut_to_image(img, lattice)), repeat
+        )),
+    }
+
+
+def bench_analysis(app_module, repeat):
+    """Analysis overhead around an instant in-process client: misses, then hits"""
+    client = FakeOpenAIClient(mode="varied")
+    prepared = app_module.prepare_upload(sample_jpeg())
+    run = f"{time.time()}"
+    miss = time_calls(lambda i: app_module.analyze_image_with_openai(prepared, f"miss {run} {i}", client=client), repeat)
+    hit = time_calls(lambda i: app_module.analyze_image_with_openai(prepared, f"miss {run} 0", client=client), repeat)
+    return {"analysis_cache_miss": summarize(miss), "analysis_cache_hit": summarize(hit)}
+
+
+def post_process_lut(client, image, prompt):
+    start = time.perf_counter()
+    response = client.post("/api/process-lut", data={"prompt": prompt, "image": (io.BytesIO(image), "sample.jpg")})
+    return time.perf_counter() - start, response.status_code
+
+
+def bench_requests(app_module, fake, requests, concurrency):
+    """The full /api/process-lut path through the real SDK and the fake server"""
+    image = sample_jpeg()
+    run = f"{time.time()}"
+    client = app_module.app.test_client()
+    results = {}
+
+    def sequential(name, prompt_for, mode):
+        fake.backend.mode = mode
+        durations, errors = [], 0
+        start = time.perf_counter()
+        for index in range(requests):
+            elapsed, status = post_process_lut(client, image, prompt_for(index))
+            if status == 200:
+                durations.append(elapsed)
+            else:
+                errors += 1
+        results[name] = summarize(durations, time.perf_counter() - start, errors)
+
+    # Every analysis and every LUT is new
+    sequential("request_cache_miss", lambda i: f"miss {run} {i}", "varied")
+    # Same image and prompt: analysis and LUT both come from cache
+    post_process_lut(client, image, f"hit {run}")
+    sequential("request_cache_hit", lambda i: f"hit {run}", "canned")
+
+    fake.backend.mode = "varied"
+    durations, errors = [], []
+    lock = threading.Lock()
+
+    def one(index):
+        elapsed, status = post_process_lut(app_module.app.test_client(), image, f"concurrent {run} {index}")
+        with lock:
+            (durations if status == 200 else errors).append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, range(requests)))
+    results[f"request_concurrent_{concurrency}"] = summarize(durations, time.perf_counter() - start, len(errors))
+
+    # Malformed replies must fail fast with a 500 rather than hang or crash
+    fake.backend.mode = "malformed"
+    errors = []
+    for index in range(max(1, requests // 4)):
+        elapsed, status = post_process_lut(client, image, f"malformed {run} {index}")
+        errors.append(elapsed)
+        if status != 500:
+            raise AssertionError(f"Malformed upstream reply returned HTTP {status}, expected 500")
+    results["request_malformed_reply"] = summarize(errors)
+    fake.backend.mode = "canned"
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def compare(results, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    print(f"\nChange in p50 against {baseline_path}:")
+    for name, summary in results.items():
+        before = baseline.get(name, {}).get("p50_ms")
+        if before:
+            print(f"  {name:<28} {before:>10.2f} -> {summary['p50_ms']:>10.2f} ms ({(summary['p50_ms'] / before - 1) * 100:+.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=20, help="iterations of each micro benchmark")
+    parser.add_argument("--requests", type=int, default=40, help="requests per request-path scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.3, help="fake OpenAI latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1, help="extra random fake OpenAI latency")
+    parser.add_argument("--quick", action="store_true", help="few iterations, for smoke runs")
+    parser.add_argument("--output", help="results JSON path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results JSON to compare p50 latencies against")
+    args = parser.parse_args()
+    if args.quick:
+        args.repeat, args.requests = 3, 6
+
+    fake = FakeOpenAIServer(latency=args.latency, jitter=args.jitter).start()
+    workdir = tempfile.mkdtemp(prefix="lut-bench-")
+    os.environ.update({
+        "OPENAI_API_KEY": "fake-key",
+        "OPENAI_BASE_URL": fake.base_url,
+        "JANITOR_INTERVAL": "0",
+        "ANALYSIS_CACHE_PATH": os.path.join(workdir, "analysis_cache.sqlite3"),
+    })
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        import app as app_module
+
+        results = {}
+        sections = (
+            ("LUT generation", lambda: bench_lut_generation(args.repeat)),
+            ("previews", lambda: bench_previews(args.repeat)),
+            ("analysis", lambda: bench_analysis(app_module, args.repeat)),
+            ("request path", lambda: bench_requests(app_module, fake, args.requests, args.concurrency)),
+        )
+        for title, run in sections:
+            print(f"⏱️  {title}...", file=sys.stderr)
+            results.update(run())
+    finally:
+        os.chdir(cwd)
+        fake.stop()
+
+    print(f"\n{'benchmark':<28} {'n':>4} {'err':>4} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'req/s':>8}")
+    for name, summary in results.items():
+        throughput = summary.get("throughput_rps")
+        print(f"{name:<28} {summary['count']:>4} {summary['errors']:>4} {summary['p50_ms']:>10.2f} "
+              f"{summary['p95_ms']:>10.2f} {summary['p99_ms']:>10.2f} {throughput if throughput is not None else '':>8}")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "config": vars(args),
+        "results": results,
+    }
+    output = args.output or os.path.join(RESULTS_DIRECTORY, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n📄 Results written to {output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
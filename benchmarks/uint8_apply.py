@@ -0,0 +1,52 @@
+"""Compare the baked 8-bit lookup path with float trilinear interpolation.
+
+Reports table bake time and size, megapixels per second for both paths on
+a noisy uint8 frame, and the largest and mean difference in 8-bit levels
+over random colors. Run from the repository root:
+
+    python -m benchmarks.uint8_apply
+"""
+import argparse
+import time
+
+import numpy as np
+
+from benchmarks.lut_generation import SAMPLE_INSTRUCTIONS
+from lut_apply import apply_lut_to_array, apply_uint8_table, bake_uint8_table, uint8_table_error
+from lut_generator import LUTGenerator
+
+SIZES = (17, 33, 65)
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=1920)
+    parser.add_argument("--height", type=int, default=1080)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    pixels = np.random.default_rng(0).integers(0, 256, size=(args.height, args.width, 3), dtype=np.uint8)
+    megapixels = args.width * args.height / 1e6
+    print(f"{'size':>5} {'table MB':>9} {'bake ms':>8} {'float MP/s':>11} {'uint8 MP/s':>11} {'speedup':>8} {'max err':>8} {'mean err':>9}")
+    for size in SIZES:
+        lattice = LUTGenerator(lut_size=size).generate_lattice(SAMPLE_INSTRUCTIONS)
+        bake = best_of(lambda: bake_uint8_table(lattice), args.repeat)
+        table = bake_uint8_table(lattice)
+        float_seconds = best_of(lambda: apply_lut_to_array(pixels, lattice), args.repeat)
+        table_seconds = best_of(lambda: apply_uint8_table(pixels, table), args.repeat)
+        error = uint8_table_error(lattice, table)
+        print(f"{size:>5} {table.nbytes / 1e6:>9.2f} {bake * 1000:>8.1f} {megapixels / float_seconds:>11.2f} "
+              f"{megapixels / table_seconds:>11.2f} {float_seconds / table_seconds:>7.1f}x {error['max']:>8} {error['mean']:>9.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""Production server settings: gunicorn -c gunicorn.conf.py app:app
+
+Threaded workers (gthread) suit this app: requests spend most of their
+time waiting on the OpenAI API, and NumPy releases the GIL while grading.
+The job queue, edit sessions and LUT cache live in process memory, so the
+default is one worker with many threads; more workers need sticky routing
+(a job must be polled on the worker that queued it). Every setting can be
+overridden from the environment or .env.
+"""
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+worker_class = "gthread"
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 16))
+# Load the app once in the master; workers fork from it with everything imported
+preload_app = True
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+graceful_timeout = 30
+keepalive = 5
+# Recycling a worker drops its queued jobs and edit sessions, so it is off
+# unless GUNICORN_MAX_REQUESTS is set to bound slow memory growth
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+accesslog = "-"
+errorlog = "-"
+
+def on_starting(server):
+    # app.py imports these lazily to keep cold starts fast; importing them in
+    # the master lets every forked worker share the already loaded modules
+    import numpy  # noqa: F401
+    import openai  # noqa: F401
+    import lut_apply  # noqa: F401
+    import lut_generator  # noqa: F401
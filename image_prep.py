@@ -0,0 +1,78 @@
+import io
+import os
+
+from PIL import Image, ImageOps
+
+class PreparedImage:
+    """An upload decoded once and shared by the vision call and the preview
+
+    ``image`` is the full-resolution RGB image. The downscaled JPEG sent to
+    the vision model and the local image statistics are computed lazily, so
+    cache hits never pay for them.
+    """
+
+    def __init__(self, image, raw_bytes, max_edge=1024, quality=85, format=None):
+        self.image = image
+        self.raw_bytes = raw_bytes
+        self.format = format
+        self.max_edge = max_edge
+        self.quality = quality
+        self._vision_jpeg = None
+        self._jpegs = {}
+        self._image_stats = None
+
+    @property
+    def original_bytes(self):
+        return len(self.raw_bytes)
+
+    def vision_jpeg(self, max_edge=None):
+        """Return the image resized to ``max_edge`` and re-encoded as JPEG
+        
+        ``max_edge`` defaults to the one the upload was prepared with. The
+        last JPEG returned is the one ``stats`` reports as sent.
+        """
+        max_edge = max_edge or self.max_edge
+        if max_edge not in self._jpegs:
+            img = self.image
+            if max(img.size) > max_edge:
+                img = img.copy()
+                img.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+            buffer = io.BytesIO()
+            img.save(buffer, "JPEG", quality=self.quality, optimize=True)
+            data = buffer.getvalue()
+            # A small JPEG upload can be cheaper to send as-is
+            if img is self.image and self.format == "JPEG" and self.original_bytes <= len(data):
+                data = self.raw_bytes
+            self._jpegs[max_edge] = data
+        self._vision_jpeg = self._jpegs[max_edge]
+        return self._vision_jpeg
+    
+    def image_stats(self):
+        """Return the local histogram, exposure and color statistics"""
+        if self._image_stats is None:
+            from image_stats import compute_image_stats
+            self._image_stats = compute_image_stats(self.image)
+        return self._image_stats
+
+    def stats(self):
+        """Report the upload size and, once encoded, the bytes sent and saved"""
+        stats = {"original_bytes": self.original_bytes, "dimensions": list(self.image.size)}
+        if self._vision_jpeg is not None:
+            stats["vision_bytes"] = len(self._vision_jpeg)
+            stats["bytes_saved"] = self.original_bytes - len(self._vision_jpeg)
+        return stats
+
+def prepare_image(source, max_edge=1024, quality=85):
+    """Decode an upload (path, bytes or file object) into a PreparedImage"""
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            raw_bytes = f.read()
+    elif isinstance(source, (bytes, bytearray)):
+        raw_bytes = bytes(source)
+    else:
+        raw_bytes = source.read()
+
+    img = Image.open(io.BytesIO(raw_bytes))
+    source_format = img.format
+    img = ImageOps.exif_transpose(img)
+    return PreparedImage(img.convert('RGB'), raw_bytes, max_edge=max_edge, quality=quality, format=source_format)
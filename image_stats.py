@@ -0,0 +1,171 @@
+"""Local image statistics and preset grades that need no vision call.
+
+``compute_image_stats`` measures a downscaled copy of an upload: a
+luminance histogram and percentiles, a gray-world color cast and
+saturation. ``match_preset`` recognises short prompts that only name a
+stock look (warm, cool, vintage, cinematic), and ``preset_instructions``
+turns such a preset into grading instructions corrected for the measured
+statistics, in the same shape the vision model returns.
+"""
+import re
+
+import numpy as np
+from PIL import Image
+
+STATS_EDGE = 256
+HISTOGRAM_BINS = 16
+# sRGB value a well exposed median should sit near
+MID_GRAY = 0.46
+
+PRESETS = {
+    "warm": {
+        "keywords": {"warm", "warmer", "golden", "sunny", "sunset"},
+        "base_style": "Warm",
+        "adjustments": {"temperature": 25, "tint": 3, "saturation": 5, "vibrance": 10},
+        "color_wheels": {"highlights": {"red": 0.3, "green": 0.1, "blue": -0.2}},
+    },
+    "cool": {
+        "keywords": {"cool", "cooler", "cold", "colder", "icy", "blue"},
+        "base_style": "Cool",
+        "adjustments": {"temperature": -25, "tint": -2, "saturation": -5, "vibrance": 5},
+        "color_wheels": {"shadows": {"red": -0.1, "green": 0.0, "blue": 0.3}},
+    },
+    "vintage": {
+        "keywords": {"vintage", "retro", "faded", "film", "analog", "analogue", "old"},
+        "base_style": "Vintage film",
+        "adjustments": {"temperature": 10, "contrast": -15, "highlights": -15, "blacks": 25, "saturation": -20},
+        "color_wheels": {
+            "shadows": {"red": 0.0, "green": 0.2, "blue": 0.3},
+            "highlights": {"red": 0.3, "green": 0.2, "blue": -0.2},
+        },
+    },
+    "cinematic": {
+        "keywords": {"cinematic", "cinema", "movie", "teal", "orange", "blockbuster", "hollywood"},
+        "base_style": "Cinematic teal and orange",
+        "adjustments": {"contrast": 20, "highlights": -20, "shadows": 10, "blacks": -5, "saturation": -5, "vibrance": 10},
+        "color_wheels": {
+            "shadows": {"red": -0.2, "green": 0.1, "blue": 0.4},
+            "highlights": {"red": 0.4, "green": 0.1, "blue": -0.3},
+        },
+    },
+}
+
+# Words that may surround a preset name without changing its meaning
+FILLER_WORDS = {
+    "a", "an", "the", "and", "with", "in", "to", "of", "it", "this", "me", "my", "please",
+    "make", "give", "add", "apply", "turn", "more", "look", "looking", "style", "styled",
+    "grade", "graded", "grading", "color", "colour", "tone", "toned", "tones", "feel",
+    "vibe", "mood", "effect", "lut", "image", "photo", "picture", "shot",
+}
+# Intensity words and the factor they scale a preset by
+INTENSITY_WORDS = {
+    "slightly": 0.5, "subtle": 0.5, "subtly": 0.5, "bit": 0.5, "little": 0.5, "touch": 0.5, "light": 0.5,
+    "very": 1.5, "strong": 1.5, "strongly": 1.5, "extra": 1.5, "heavy": 1.5, "heavily": 1.5,
+}
+
+def _downscale(img, max_edge):
+    if max(img.size) <= max_edge:
+        return img
+    # Box-reduce by an integer factor first; it is much cheaper than resampling
+    factor = max(img.size) // max_edge
+    if factor > 1:
+        img = img.reduce(factor)
+        if max(img.size) <= max_edge:
+            return img
+    scale = max_edge / max(img.size)
+    return img.resize((max(1, round(img.width * scale)), max(1, round(img.height * scale))), Image.Resampling.BILINEAR)
+
+def compute_image_stats(img, max_edge=STATS_EDGE):
+    """Measure exposure, contrast, color cast and saturation of a PIL image"""
+    rgb = np.asarray(_downscale(img.convert("RGB"), max_edge), dtype=np.float32).reshape(-1, 3) / 255.0
+    luma = rgb @ np.array([0.2126, 0.7152, 0.0722], dtype=np.float32)
+    p1, p5, p25, p50, p75, p95, p99 = (float(v) for v in np.percentile(luma, [1, 5, 25, 50, 75, 95, 99]))
+    histogram = np.histogram(luma, bins=HISTOGRAM_BINS, range=(0.0, 1.0))[0] / luma.size
+
+    # Gray world: the average color of a neutral scene is gray
+    mean_rgb = rgb.mean(axis=0)
+    gray = max(float(mean_rgb.mean()), 1e-6)
+    maximum = rgb.max(axis=1)
+    saturation = (maximum - rgb.min(axis=1)) / np.maximum(maximum, 1e-6)
+
+    return {
+        "luma_mean": round(float(luma.mean()), 4),
+        "luma_percentiles": {name: round(value, 4) for name, value in (
+            ("p1", p1), ("p5", p5), ("p25", p25), ("p50", p50), ("p75", p75), ("p95", p95), ("p99", p99)
+        )},
+        "luma_histogram": [round(float(v), 4) for v in histogram],
+        "exposure_ev": round(float(np.log2(max(p50, 1e-3) / MID_GRAY)), 3),
+        "contrast_range": round(p95 - p5, 4),
+        "contrast_rms": round(float(luma.std()), 4),
+        "clipped_shadows": round(float((luma <= 0.02).mean()), 4),
+        "clipped_highlights": round(float((luma >= 0.98).mean()), 4),
+        "mean_rgb": [round(float(v), 4) for v in mean_rgb],
+        "gray_world_gains": [round(gray / max(float(v), 1e-6), 4) for v in mean_rgb],
+        # Positive is a warm (red over blue) cast, negative a cool one
+        "warmth": round(float(mean_rgb[0] - mean_rgb[2]) / gray, 4),
+        # Positive is a green cast, negative a magenta one
+        "tint": round(float(mean_rgb[1] - (mean_rgb[0] + mean_rgb[2]) / 2) / gray, 4),
+        "saturation_mean": round(float(saturation.mean()), 4),
+        "saturation_p90": round(float(np.percentile(saturation, 90)), 4),
+    }
+
+def match_preset(prompt):
+    """Return ``(preset name, intensity)`` if the prompt only asks for a stock look, else None"""
+    words = [w for w in re.findall(r"[a-z]+", prompt.lower()) if w not in FILLER_WORDS]
+    intensity = 1.0
+    matched = set()
+    for word in words:
+        if word in INTENSITY_WORDS:
+            intensity = INTENSITY_WORDS[word]
+            continue
+        names = {name for name, preset in PRESETS.items() if word in preset["keywords"]}
+        if not names:
+            # Anything else needs the vision model to interpret
+            return None
+        matched |= names
+    # "teal and orange" is one look; "warm vintage" is two and goes upstream
+    if len(matched) != 1:
+        return None
+    return matched.pop(), intensity
+
+def _signed(value, digits=0):
+    value = round(value, digits) if digits else int(round(value))
+    return f"+{value}" if value > 0 else str(value)
+
+def preset_instructions(name, stats, intensity=1.0):
+    """Grading instructions for a preset, corrected for the measured statistics"""
+    preset = PRESETS[name]
+    adjustments = {key: value * intensity for key, value in preset["adjustments"].items()}
+
+    # Neutralise part of any existing cast before adding the look's own
+    adjustments["temperature"] = adjustments.get("temperature", 0) - float(np.clip(stats["warmth"] * 60, -20, 20))
+    adjustments["tint"] = adjustments.get("tint", 0) + float(np.clip(stats["tint"] * 60, -15, 15))
+    adjustments["exposure"] = float(np.clip(-stats["exposure_ev"] * 0.5, -0.5, 0.5))
+    if stats["contrast_range"] > 0.85:
+        adjustments["contrast"] = adjustments.get("contrast", 0) - 10
+    elif stats["contrast_range"] < 0.5:
+        adjustments["contrast"] = adjustments.get("contrast", 0) + 10
+    if stats["saturation_mean"] > 0.5:
+        adjustments["saturation"] = adjustments.get("saturation", 0) - 10
+    elif stats["saturation_mean"] < 0.15:
+        adjustments["saturation"] = adjustments.get("saturation", 0) + 10
+    if stats["clipped_highlights"] > 0.02:
+        adjustments["highlights"] = adjustments.get("highlights", 0) - 10
+
+    formatted = {
+        key: _signed(float(np.clip(value, -2.0, 2.0)), 2) if key == "exposure" else _signed(float(np.clip(value, -100, 100)))
+        for key, value in adjustments.items()
+    }
+    color_wheels = {
+        region: {channel: round(value * intensity, 3) for channel, value in wheel.items()}
+        for region, wheel in preset["color_wheels"].items()
+    }
+    return {
+        "base_style": preset["base_style"],
+        "adjustments": formatted,
+        "color_wheels": color_wheels,
+        "description": (
+            f"{preset['base_style']} preset applied locally at {intensity:g}x strength, corrected for a measured "
+            f"exposure of {stats['exposure_ev']:+.2f} EV, warmth {stats['warmth']:+.2f} and tint {stats['tint']:+.2f}."
+        ),
+    }
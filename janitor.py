@@ -0,0 +1,115 @@
+import os
+import threading
+import time
+
+# Staging files (``*.tmp``) younger than this may be mid-write, about to be
+# os.replace()d into place; older ones are leftovers of a crashed writer
+STALE_TMP_SECONDS = 3600
+
+class Janitor:
+    """Background thread that evicts generated files by age and disk quota
+
+    ``rules`` maps a directory to ``(max_age_seconds, max_bytes)``. Each sweep
+    first deletes files older than the age limit, then deletes the oldest
+    remaining files until the directory fits its quota. A limit of 0
+    disables that check. Dotfiles such as ``.gitkeep`` are never touched,
+    and ``*.tmp`` staging files are only removed once they are stale.
+    """
+
+    def __init__(self, rules, interval=300):
+        self.rules = rules
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.sweeps = 0
+        self.removed_files = 0
+        self.removed_bytes = 0
+        self.last_sweep = None
+        # Forked workers (e.g. under gunicorn --preload) inherit no thread
+        os.register_at_fork(after_in_child=self._after_fork)
+
+    def _after_fork(self):
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None and self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="janitor", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"🧹 Janitor sweep failed: {e}")
+
+    def sweep(self):
+        """Apply every rule once and return the number of files removed"""
+        now = time.time()
+        removed = 0
+        for directory, (max_age, max_bytes) in self.rules.items():
+            files, stale = [], []
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.name.startswith(".") or not entry.is_file(follow_symlinks=False):
+                            continue
+                        stat = entry.stat()
+                        if entry.name.endswith(".tmp"):
+                            if now - stat.st_mtime > STALE_TMP_SECONDS:
+                                stale.append((stat.st_size, entry.path))
+                            continue
+                        files.append((stat.st_mtime, stat.st_size, entry.path))
+            except FileNotFoundError:
+                continue
+            files.sort()
+
+            for size, path in stale:
+                removed += self._remove(path, size)
+            total = sum(size for _, size, _ in files)
+            for mtime, size, path in files:
+                expired = max_age and now - mtime > max_age
+                over_quota = max_bytes and total > max_bytes
+                if not expired and not over_quota:
+                    # Files are oldest first, so nothing later is expired either
+                    break
+                if self._remove(path, size):
+                    total -= size
+                    removed += 1
+
+        with self._lock:
+            self.sweeps += 1
+            self.last_sweep = now
+        if removed:
+            print(f"🧹 Janitor removed {removed} file(s)")
+        return removed
+
+    def _remove(self, path, size):
+        """Delete one file and count it; returns 1 if it is gone, else 0"""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"🧹 Could not remove {path}: {e}")
+            return 0
+        with self._lock:
+            self.removed_files += 1
+            self.removed_bytes += size
+        return 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sweeps": self.sweeps,
+                "removed_files": self.removed_files,
+                "removed_bytes": self.removed_bytes,
+                "last_sweep": self.last_sweep,
+                "interval_seconds": self.interval,
+            }
@@ -0,0 +1,126 @@
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+class QueueFullError(Exception):
+    """Raised when a job is submitted while the queue is at its depth limit"""
+
+class JobQueue:
+    """Bounded background job runner with pollable status
+
+    At most ``max_workers`` jobs run concurrently and at most ``max_pending``
+    jobs may be queued or running at once; further submissions raise
+    QueueFullError so callers can apply backpressure. Finished jobs are kept
+    for ``result_ttl`` seconds so clients can collect their results.
+    """
+
+    def __init__(self, max_workers=4, max_pending=32, result_ttl=3600):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="lut-job")
+        self._jobs = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def submit(self, fn, *args, kind="lut", **kwargs):
+        """Queue ``fn(*args, **kwargs)`` and return the new job id
+
+        ``kind`` is recorded on the job so status pages can describe it.
+        """
+        with self._lock:
+            self._prune()
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFullError(f"Job queue is full ({self.max_pending} pending)")
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "job_id": job_id,
+                "kind": kind,
+                "status": "queued",
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "result": None,
+                "error": None,
+                "error_stage": None,
+            }
+            self._pending += 1
+        self._executor.submit(self._run, job_id, fn, args, kwargs)
+        return job_id
+
+    def _run(self, job_id, fn, args, kwargs):
+        job = self._jobs[job_id]
+        job["status"] = "running"
+        job["started_at"] = time.time()
+        try:
+            job["result"] = fn(*args, **kwargs)
+            job["status"] = "succeeded"
+        except Exception as e:
+            job["error"] = str(e)
+            job["error_stage"] = getattr(e, "stage", None)
+            job["status"] = "failed"
+        finally:
+            job["finished_at"] = time.time()
+            with self._lock:
+                self._pending -= 1
+
+    def _prune(self):
+        cutoff = time.time() - self.result_ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished_at"] is not None and job["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def get(self, job_id):
+        """Return a snapshot of the job record, or None if unknown or expired"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def position(self, job_id):
+        """Return how many queued jobs were submitted before ``job_id``"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] != "queued":
+                return 0
+            return sum(
+                1 for other in self._jobs.values()
+                if other["status"] == "queued" and other["submitted_at"] < job["submitted_at"]
+            )
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return {
+                "pending": self._pending,
+                "max_pending": self.max_pending,
+                "max_workers": self.max_workers,
+                "rejected": self.rejected,
+                "jobs": counts,
+            }
+
+class RateLimiter:
+    """Spaces out calls so at most ``rate`` start per second across all threads"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until the caller may start its call"""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
@@ -0,0 +1,138 @@
+"""Interactive tweaks of generated LUTs: parameter deltas and edit sessions.
+
+An edit session remembers, per LUT file, the instructions the LUT was built
+from, the generator's stage checkpoints and a small proxy of the source
+image. A tweak applies deltas to the instructions, regenerates only the
+stages after the first changed one, and grades the proxy for a quick
+preview.
+"""
+import copy
+import io
+import threading
+from collections import OrderedDict
+
+from PIL import Image
+
+# Adjustment ranges, matching those the vision model is asked for
+ADJUSTMENT_RANGES = {
+    "temperature": (-100, 100),
+    "tint": (-100, 100),
+    "exposure": (-2.0, 2.0),
+    "contrast": (-100, 100),
+    "highlights": (-100, 100),
+    "shadows": (-100, 100),
+    "whites": (-100, 100),
+    "blacks": (-100, 100),
+    "saturation": (-100, 100),
+    "vibrance": (-100, 100),
+}
+COLOR_WHEEL_REGIONS = ("shadows", "midtones", "highlights")
+COLOR_WHEEL_CHANNELS = ("red", "green", "blue")
+COLOR_WHEEL_RANGE = (-1.0, 1.0)
+PROXY_EDGE = 256
+
+def _clamp(value, bounds):
+    return min(max(value, bounds[0]), bounds[1])
+
+def apply_deltas(lut_instructions, deltas):
+    """Return a copy of ``lut_instructions`` with ``deltas`` added and clamped
+
+    ``deltas`` maps adjustment names to numbers, and may hold
+    ``color_wheels`` as ``{region: {channel: delta}}``. Raises ValueError
+    for unknown names or non-numeric values.
+    """
+    from lut_generator import safe_float
+
+    instructions = copy.deepcopy(lut_instructions)
+    adjustments = instructions.setdefault("adjustments", {})
+    for name, delta in deltas.items():
+        if name == "color_wheels":
+            continue
+        if name not in ADJUSTMENT_RANGES:
+            raise ValueError(f"Unknown adjustment: {name}")
+        if not isinstance(delta, (int, float)) or isinstance(delta, bool):
+            raise ValueError(f"Delta for {name} must be a number")
+        value = _clamp(safe_float(adjustments.get(name, 0)) + delta, ADJUSTMENT_RANGES[name])
+        adjustments[name] = round(value, 3) if name == "exposure" else round(value, 1)
+
+    wheel_deltas = deltas.get("color_wheels") or {}
+    if not isinstance(wheel_deltas, dict):
+        raise ValueError("color_wheels deltas must be an object")
+    wheels = instructions.get("color_wheels")
+    if wheel_deltas and not isinstance(wheels, dict):
+        wheels = instructions["color_wheels"] = {}
+    for region, channels in wheel_deltas.items():
+        if region not in COLOR_WHEEL_REGIONS or not isinstance(channels, dict):
+            raise ValueError(f"Unknown color wheel: {region}")
+        wheel = wheels.setdefault(region, {})
+        for channel, delta in channels.items():
+            if channel not in COLOR_WHEEL_CHANNELS:
+                raise ValueError(f"Unknown color wheel channel: {channel}")
+            if not isinstance(delta, (int, float)) or isinstance(delta, bool):
+                raise ValueError(f"Delta for color_wheels.{region}.{channel} must be a number")
+            wheel[channel] = round(_clamp(safe_float(wheel.get(channel, 0)) + delta, COLOR_WHEEL_RANGE), 4)
+    return instructions
+
+def make_proxy(img, edge=PROXY_EDGE):
+    """Downscale a PIL image to at most ``edge`` pixels on its long side"""
+    if max(img.size) <= edge:
+        return img.convert("RGB")
+    proxy = img.convert("RGB")
+    proxy.thumbnail((edge, edge), Image.Resampling.BILINEAR, reducing_gap=2.0)
+    return proxy
+
+def encode_proxy_preview(img, quality=80):
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=quality)
+    return buffer.getvalue()
+
+def session_size(session):
+    """Approximate bytes held by a session's checkpoints and proxy"""
+    arrays = {id(a): a.nbytes for _, state in session.get("checkpoints") or () for a in state}
+    proxy = session.get("proxy")
+    return sum(arrays.values()) + (proxy.width * proxy.height * 3 if proxy is not None else 0)
+
+class EditSessions:
+    """Thread-safe LRU of edit sessions keyed by LUT file, bounded by count and bytes
+
+    A session is a dict with ``lut_instructions``, ``lut_size``,
+    ``checkpoints`` (from ``LUTGenerator.generate_lattice_incremental``, or
+    None) and ``proxy`` (a small PIL image, or None).
+    """
+
+    def __init__(self, max_entries=32, max_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._sessions = OrderedDict()
+        self._sizes = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, lut_file):
+        with self._lock:
+            session = self._sessions.get(lut_file)
+            if session is not None:
+                self._sessions.move_to_end(lut_file)
+            return session
+
+    def put(self, lut_file, session):
+        size = session_size(session)
+        with self._lock:
+            if lut_file in self._sessions:
+                self._bytes -= self._sizes.pop(lut_file)
+                del self._sessions[lut_file]
+            self._sessions[lut_file] = session
+            self._sizes[lut_file] = size
+            self._bytes += size
+            while self._sessions and (len(self._sessions) > self.max_entries or self._bytes > self.max_bytes):
+                evicted, _ = self._sessions.popitem(last=False)
+                self._bytes -= self._sizes.pop(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._sessions),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
@@ -0,0 +1,236 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+# Pixels interpolated per chunk; bounds the temporary arrays on large frames
+DEFAULT_CHUNK_PIXELS = 1 << 18
+
+INTERPOLATION_METHODS = ("trilinear", "tetrahedral")
+
+def _lattice_table(lattice):
+    """Flatten an (N, N, N, 3) lattice indexed [b, g, r] into an (N³, 3) table"""
+    size = lattice.shape[0]
+    if lattice.shape != (size, size, size, 3):
+        raise ValueError(f"Expected an (N, N, N, 3) lattice, got {lattice.shape}")
+    return np.ascontiguousarray(lattice, dtype=np.float32).reshape(-1, 3), size
+
+def _cell_coordinates(rgb, size):
+    """Split normalized RGB into lattice cell base indices and fractions"""
+    scaled = np.clip(rgb, 0.0, 1.0) * np.float32(size - 1)
+    base = np.minimum(scaled.astype(np.int32), size - 2)
+    return base, scaled - base
+
+def _trilinear(rgb, table, size):
+    base, frac = _cell_coordinates(rgb, size)
+    index = (base[:, 2] * size + base[:, 1]) * size + base[:, 0]
+    fr, fg, fb = frac[:, 0:1], frac[:, 1:2], frac[:, 2:3]
+    g_step, b_step = size, size * size
+
+    c00 = table[index] * (1 - fr) + table[index + 1] * fr
+    c10 = table[index + g_step] * (1 - fr) + table[index + g_step + 1] * fr
+    c01 = table[index + b_step] * (1 - fr) + table[index + b_step + 1] * fr
+    c11 = table[index + g_step + b_step] * (1 - fr) + table[index + g_step + b_step + 1] * fr
+
+    c0 = c00 * (1 - fg) + c10 * fg
+    c1 = c01 * (1 - fg) + c11 * fg
+    return c0 * (1 - fb) + c1 * fb
+
+def _tetrahedral(rgb, table, size):
+    base, frac = _cell_coordinates(rgb, size)
+    index = (base[:, 2] * size + base[:, 1]) * size + base[:, 0]
+
+    # Walk from the cell origin to the far corner along the axes in order of
+    # decreasing fraction; the four visited vertices bound the tetrahedron
+    # containing the sample.
+    order = np.argsort(-frac, axis=1)
+    f = np.take_along_axis(frac, order, axis=1)
+    steps = np.array([1, size, size * size], dtype=np.int32)[order]
+    v1 = index + steps[:, 0]
+    v2 = v1 + steps[:, 1]
+    v3 = index + (1 + size + size * size)
+
+    return (
+        table[index] * (1 - f[:, 0:1])
+        + table[v1] * (f[:, 0:1] - f[:, 1:2])
+        + table[v2] * (f[:, 1:2] - f[:, 2:3])
+        + table[v3] * f[:, 2:3]
+    )
+
+def apply_lut(rgb, lattice, method="trilinear", chunk_pixels=DEFAULT_CHUNK_PIXELS):
+    """Map normalized RGB values through a LUT lattice
+
+    ``rgb`` is any array whose last axis holds R, G, B in [0, 1]; the result
+    has the same shape as float32. ``lattice`` is the (N, N, N, 3) array
+    produced by ``LUTGenerator.generate_lattice``.
+    """
+    if method not in INTERPOLATION_METHODS:
+        raise ValueError(f"Unknown interpolation method: {method}")
+    interpolate = _trilinear if method == "trilinear" else _tetrahedral
+    table, size = _lattice_table(lattice)
+
+    pixels = np.asarray(rgb, dtype=np.float32).reshape(-1, 3)
+    out = np.empty_like(pixels)
+    for start in range(0, len(pixels), chunk_pixels):
+        stop = start + chunk_pixels
+        out[start:stop] = interpolate(pixels[start:stop], table, size)
+    return np.clip(out, 0.0, 1.0).reshape(np.shape(rgb))
+
+def apply_lut_to_array(pixels, lattice, method="trilinear", chunk_pixels=DEFAULT_CHUNK_PIXELS):
+    """Apply a LUT to an (..., 3) uint8 array, returning uint8"""
+    out = np.empty(pixels.shape, dtype=np.uint8)
+    flat_in = pixels.reshape(-1, 3)
+    flat_out = out.reshape(-1, 3)
+    # Convert to float one chunk at a time so the float copy stays bounded too
+    for start in range(0, len(flat_in), chunk_pixels):
+        stop = start + chunk_pixels
+        rgb = flat_in[start:stop].astype(np.float32) / np.float32(255)
+        mapped = apply_lut(rgb, lattice, method=method, chunk_pixels=chunk_pixels)
+        flat_out[start:stop] = np.rint(mapped * 255)
+    return out
+
+def apply_lut_to_image(img, lattice, method="trilinear", chunk_pixels=DEFAULT_CHUNK_PIXELS):
+    """Apply a LUT to a PIL image and return a new RGB image"""
+    pixels = np.asarray(img.convert('RGB'))
+    return Image.fromarray(apply_lut_to_array(pixels, lattice, method=method, chunk_pixels=chunk_pixels), 'RGB')
+
+# 8-bit fast path. A baked table holds the LUT already interpolated at every
+# (R, G) input level, for each of the N blue lattice planes, so grading a
+# pixel is two gathers and one blend along blue instead of eight gathers
+# and seven blends. Entries pack three 10-bit outputs into a uint32, which
+# bounds the table to N * 256 KB (8.6 MB at 33³) where a full 256³ table
+# would take 48 MB or more.
+TABLE_BITS = 10
+TABLE_LEVELS = (1 << TABLE_BITS) - 1
+TABLE_PLANE = 256 * 256
+# Baking costs about as much as grading this many pixels per lattice plane
+# on the float path, so smaller images are graded directly unless a table
+# is already cached
+BAKE_MIN_PIXELS_PER_PLANE = 4096
+
+def _level_coordinates(size):
+    """Lattice cell base indices and fractions for the 256 input levels"""
+    x = np.arange(256, dtype=np.float64) / 255 * (size - 1)
+    base = np.minimum(x.astype(np.intp), size - 2)
+    return base, (x - base).astype(np.float32)
+
+def bake_uint8_table(lattice):
+    """Bake an (N, N, N, 3) lattice into a flat uint32 table for ``apply_uint8_table``
+
+    Entry ``b * 65536 + g * 256 + r`` holds the LUT output at lattice blue
+    plane ``b`` and input levels ``g``, ``r``, interpolated along R and G in
+    float32 and quantized to 10 bits per channel.
+    """
+    _, size = _lattice_table(lattice)
+    base, frac = _level_coordinates(size)
+    packed = np.zeros((size, 256, 256), dtype=np.uint32)
+    for channel in range(3):
+        plane = np.asarray(lattice[..., channel], dtype=np.float32)
+        # Along R (last axis), then along G, one channel at a time
+        plane = plane[:, :, base] + (plane[:, :, base + 1] - plane[:, :, base]) * frac
+        low, high = plane[:, base, :], plane[:, base + 1, :]
+        high -= low
+        high *= frac[None, :, None]
+        high += low
+        np.clip(high, 0.0, 1.0, out=high)
+        high *= TABLE_LEVELS
+        high += 0.5
+        packed |= high.astype(np.uint32) << (TABLE_BITS * channel)
+    return packed.reshape(-1)
+
+def table_lut_size(table):
+    return table.size // TABLE_PLANE
+
+def apply_uint8_table(pixels, table, chunk_pixels=DEFAULT_CHUNK_PIXELS):
+    """Map an (..., 3) uint8 array through a baked table, returning uint8"""
+    if pixels.dtype != np.uint8 or pixels.shape[-1] != 3:
+        raise ValueError(f"Expected an (..., 3) uint8 array, got {pixels.dtype} {pixels.shape}")
+    base, frac = _level_coordinates(table_lut_size(table))
+    offsets = (base * TABLE_PLANE).astype(np.uint32)
+    shifts = np.array([0, TABLE_BITS, 2 * TABLE_BITS], dtype=np.uint32)
+    scale = np.float32(255 / TABLE_LEVELS)
+
+    out = np.empty(pixels.shape, dtype=np.uint8)
+    flat_in = pixels.reshape(-1, 3)
+    flat_out = out.reshape(-1, 3)
+    for start in range(0, len(flat_in), chunk_pixels):
+        chunk = flat_in[start:start + chunk_pixels]
+        r, g, b = chunk[:, 0], chunk[:, 1], chunk[:, 2]
+        index = offsets[b] + (g.astype(np.uint32) << 8 | r)
+        low = ((table[index][:, None] >> shifts) & TABLE_LEVELS).astype(np.float32)
+        high = ((table[index + TABLE_PLANE][:, None] >> shifts) & TABLE_LEVELS).astype(np.float32)
+        high -= low
+        high *= frac[b][:, None]
+        high += low
+        high *= scale
+        flat_out[start:start + chunk_pixels] = np.rint(high)
+    return out
+
+def worth_baking(pixel_count, lut_size):
+    """Whether baking a table for one image beats the float path"""
+    return pixel_count >= lut_size * BAKE_MIN_PIXELS_PER_PLANE
+
+def uint8_table_error(lattice, table=None, samples=1 << 18, seed=0):
+    """Compare the baked 8-bit path with float trilinear on random colors
+
+    Returns the largest and mean absolute difference in 8-bit levels and
+    the fraction of channel values that differ at all.
+    """
+    if table is None:
+        table = bake_uint8_table(lattice)
+    colors = np.random.default_rng(seed).integers(0, 256, size=(samples, 3), dtype=np.uint8)
+    difference = np.abs(
+        apply_uint8_table(colors, table).astype(np.int16)
+        - apply_lut_to_array(colors, lattice, method="trilinear").astype(np.int16)
+    )
+    return {
+        "max": int(difference.max()),
+        "mean": float(difference.mean()),
+        "mismatched": float((difference > 0).mean()),
+    }
+
+class Uint8TableCache:
+    """Thread-safe LRU of baked tables keyed by lattice key, bounded by bytes
+
+    ``lookup`` returns a cached table, bakes one when the image is large
+    enough for baking to pay off, or returns None to use the float path.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._tables = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.bakes = 0
+
+    def lookup(self, key, lattice, pixel_count):
+        if key is not None:
+            with self._lock:
+                table = self._tables.get(key)
+                if table is not None:
+                    self._tables.move_to_end(key)
+                    self.hits += 1
+                    return table
+        if not worth_baking(pixel_count, lattice.shape[0]):
+            return None
+        table = bake_uint8_table(lattice)
+        with self._lock:
+            self.bakes += 1
+            if key is not None and table.nbytes <= self.max_bytes and key not in self._tables:
+                self._tables[key] = table
+                self._bytes += table.nbytes
+                while self._bytes > self.max_bytes:
+                    self._bytes -= self._tables.popitem(last=False)[1].nbytes
+        return table
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._tables),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "bakes": self.bakes,
+            }
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+def lut_cache_key(adjustment_json, lut_size):
+    """Hash the normalized adjustment parameters into a cache key
+
+    Only values that change the lattice take part: the parsed numeric
+    adjustments, the color wheels and the LUT size. Titles and descriptions
+    are ignored, so differently worded but numerically equal analyses share
+    one LUT.
+    """
+    from lut_generator import parse_adjustments
+
+    params = parse_adjustments(adjustment_json)
+    params['lut_size'] = int(lut_size)
+    payload = json.dumps(params, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def entry_size(entry):
+    """Bytes held by a cache entry: the .cube text plus any cached lattice"""
+    lattice = entry.get('lattice')
+    return len(entry.get('data') or b'') + (lattice.nbytes if lattice is not None else 0)
+
+class LUTCache:
+    """Thread-safe LRU cache of rendered LUTs bounded by entry count and bytes
+
+    Entries are dicts with at least ``lut_file`` (the LUT's download name)
+    and ``data`` (the rendered .cube bytes, or None until first rendered),
+    optionally with the ``lattice`` array the file is rendered from.
+    """
+
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._names = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Return the entry for ``key`` and mark it most recently used"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def get_by_name(self, lut_file):
+        """Look up an entry by its LUT file name without touching the counters"""
+        with self._lock:
+            key = self._names.get(lut_file)
+            if key is None:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, entry):
+        """Insert ``entry`` and evict least recently used entries over the bounds"""
+        size = entry_size(entry)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._names[entry['lut_file']] = key
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._names.pop(entry['lut_file'], None)
+        self._bytes -= entry_size(entry)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+            }
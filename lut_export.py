@@ -0,0 +1,98 @@
+import io
+
+import numpy as np
+from PIL import Image
+
+from lut_generator import (
+    LUTGenerator,
+    NON_SEPARABLE_STAGES,
+    SHAPER_SIZE,
+    iter_cube_rows,
+    resample_lattice,
+    write_cube_data,
+)
+
+EXPORT_FORMATS = ("cube", "3dl", "hald", "shaper_cube")
+# Hald CLUT level: a level-L image holds an L²-point cube in L³ x L³ pixels
+HALD_LEVEL = 8
+
+def format_cube(generator, adjustment_json, lattice):
+    buffer = io.BytesIO()
+    write_cube_data(buffer, generator.cube_header(adjustment_json), lattice)
+    return buffer.getvalue()
+
+def format_3dl(adjustment_json, lattice):
+    """Render a lattice as an Autodesk .3dl (10-bit input mesh, 12-bit output)"""
+    size = lattice.shape[0]
+    mesh = np.rint(np.linspace(0, 1023, size)).astype(int)
+    # .3dl rows vary blue fastest, the opposite of .cube
+    rows = np.rint(lattice.transpose(2, 1, 0, 3).reshape(-1, 3) * 4095).astype(int)
+    lines = [f"# {adjustment_json.get('base_style', 'AI Generated LUT')}", " ".join(map(str, mesh))]
+    body = ("%d %d %d\n" * len(rows)) % tuple(rows.ravel().tolist())
+    return ("\n".join(lines) + "\n" + body).encode()
+
+def format_hald(lattice, level=HALD_LEVEL):
+    """Render a lattice as a Hald CLUT PNG of the given level"""
+    lattice = resample_lattice(lattice, level * level)
+    side = level ** 3
+    pixels = np.rint(lattice.reshape(side, side, 3) * 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels, 'RGB').save(buffer, "PNG")
+    return buffer.getvalue()
+
+def format_shaper_cube(adjustment_json, shaper, lattice):
+    """Render a 1D shaper followed by a 3D LUT in one Resolve-style .cube"""
+    base_style = adjustment_json.get('base_style', 'AI Generated LUT')
+    header = (
+        f"TITLE \"{base_style}\"\n"
+        f"# {adjustment_json.get('description', 'Generated by Adaptive LUT')}\n"
+        f"# Generated by Adaptive LUT - AI-Powered Color Grading (1D shaper + 3D)\n"
+        f"LUT_1D_SIZE {len(shaper)}\n"
+        "LUT_1D_INPUT_RANGE 0.0 1.0\n"
+        f"LUT_3D_SIZE {lattice.shape[0]}\n"
+        "LUT_3D_INPUT_RANGE 0.0 1.0\n"
+        "\n"
+    )
+    return (header + "".join(iter_cube_rows(shaper)) + "".join(iter_cube_rows(lattice))).encode()
+
+def export_luts(adjustment_json, sizes, formats, basename="adaptive_lut", shaper_size=SHAPER_SIZE, lattice=None):
+    """Render every requested size and format from one computation
+
+    The full transform is computed once at the largest requested size and
+    every smaller size, and the Hald image, is derived from it by
+    resampling. Pass ``lattice`` for LUTs that were not generated from
+    adjustments (composites, imports); it is then resampled instead.
+    Returns a dict mapping file names to their bytes.
+    """
+    sizes = sorted(set(sizes), reverse=True)
+    unknown = set(formats) - set(EXPORT_FORMATS)
+    if unknown:
+        raise ValueError(f"Unknown export format(s): {', '.join(sorted(unknown))}")
+
+    master_generator = LUTGenerator(lut_size=sizes[0])
+    if lattice is not None:
+        if "shaper_cube" in formats:
+            raise ValueError("shaper_cube export is only available for LUTs generated from adjustments")
+        master = resample_lattice(lattice, sizes[0])
+    else:
+        master = master_generator.generate_lattice(adjustment_json)
+
+    if "shaper_cube" in formats:
+        shaper = master_generator.generate_shaper(adjustment_json, size=shaper_size)
+        non_separable = master_generator.generate_lattice(adjustment_json, stages=NON_SEPARABLE_STAGES)
+
+    files = {}
+    for size in sizes:
+        generator = LUTGenerator(lut_size=size)
+        lattice = resample_lattice(master, size)
+        if "cube" in formats:
+            files[f"{basename}_{size}.cube"] = format_cube(generator, adjustment_json, lattice)
+        if "3dl" in formats:
+            files[f"{basename}_{size}.3dl"] = format_3dl(adjustment_json, lattice)
+        if "shaper_cube" in formats:
+            files[f"{basename}_{size}_shaper.cube"] = format_shaper_cube(
+                adjustment_json, shaper, resample_lattice(non_separable, size)
+            )
+    if "hald" in formats:
+        files[f"{basename}_hald{HALD_LEVEL}.png"] = format_hald(master)
+    return files
@@ -1,36 +1,63 @@
+import io
 import numpy as np
 import os
+import re
 from datetime import datetime
+from functools import lru_cache
+
+# Rows per formatted block when serializing .cube data
+CUBE_CHUNK_ROWS = 16384
+CUBE_ROW_FORMAT = "%.6f %.6f %.6f\n"
+# First numeric line of a .cube file, and comments inside its data block
+CUBE_DATA_START = re.compile(r'^[ \t]*[-+.\d]', re.MULTILINE)
+CUBE_COMMENT = re.compile(r'#[^\n]*')
+# Largest LUT_3D_SIZE accepted when parsing .cube files (the format's own limit)
+MAX_CUBE_SIZE = 256
+# Lattice points computed together per stacked pass; keeps the float64
+# temporaries of a batched generation small enough to stay cache friendly
+LATTICE_GROUP_POINTS = 1 << 18
+
+# Adjustment stages in the default order they are applied. The separable ones
+# act on each channel independently and can be expressed as per-channel 1D curves.
+SEPARABLE_STAGES = ('temperature', 'tint', 'exposure', 'contrast', 'highlights', 'shadows', 'whites', 'blacks')
+NON_SEPARABLE_STAGES = ('saturation', 'vibrance', 'color_wheels')
+COLOR_WHEEL_REGIONS = ('shadows', 'midtones', 'highlights')
+COLOR_WHEEL_CHANNELS = ('red', 'green', 'blue')
+ALL_STAGES = SEPARABLE_STAGES + NON_SEPARABLE_STAGES
+# Tone stages evaluated by lookup in a precomputed 1D curve
+TONE_STAGES = ('highlights', 'shadows', 'whites', 'blacks')
+# Entries in a 1D shaper table and in each tone curve
+SHAPER_SIZE = 4096
+TONE_CURVE_SIZE = 4096
 
 class LUTGenerator:
-    def __init__(self, lut_size=32):
+    def __init__(self, lut_size=32, stage_order=ALL_STAGES):
+        unknown = set(stage_order) - set(ALL_STAGES)
+        if unknown:
+            raise ValueError(f"Unknown adjustment stage(s): {', '.join(sorted(unknown))}")
         self.lut_size = lut_size
+        self.stage_order = tuple(stage_order)
     
     def apply_temperature_adjustment(self, r, g, b, temperature):
         """Apply color temperature adjustment (-100 to +100)"""
         temp_factor = temperature / 100.0
+        warmer = temp_factor > 0
         
-        if temp_factor > 0:  # Warmer (more red/yellow)
-            r = min(1.0, r + temp_factor * 0.1)
-            b = max(0.0, b - temp_factor * 0.05)
-        else:  # Cooler (more blue)
-            r = max(0.0, r + temp_factor * 0.05)
-            b = min(1.0, b - temp_factor * 0.1)
+        # Warmer adds red/yellow, cooler adds blue
+        r = np.where(warmer, np.minimum(1.0, r + temp_factor * 0.1), np.maximum(0.0, r + temp_factor * 0.05))
+        b = np.where(warmer, np.maximum(0.0, b - temp_factor * 0.05), np.minimum(1.0, b - temp_factor * 0.1))
             
         return r, g, b
     
     def apply_tint_adjustment(self, r, g, b, tint):
         """Apply tint adjustment (-100 to +100)"""
         tint_factor = tint / 100.0
+        magenta = tint_factor > 0
         
-        if tint_factor > 0:  # More magenta
-            r = min(1.0, r + tint_factor * 0.05)
-            b = min(1.0, b + tint_factor * 0.05)
-            g = max(0.0, g - tint_factor * 0.03)
-        else:  # More green
-            g = min(1.0, g - tint_factor * 0.05)
-            r = max(0.0, r + tint_factor * 0.03)
-            b = max(0.0, b + tint_factor * 0.03)
+        # Positive tint shifts towards magenta, negative towards green
+        r = np.where(magenta, np.minimum(1.0, r + tint_factor * 0.05), np.maximum(0.0, r + tint_factor * 0.03))
+        b = np.where(magenta, np.minimum(1.0, b + tint_factor * 0.05), np.maximum(0.0, b + tint_factor * 0.03))
+        g = np.where(magenta, np.maximum(0.0, g - tint_factor * 0.03), np.minimum(1.0, g - tint_factor * 0.05))
             
         return r, g, b
     
@@ -69,37 +96,318 @@ class LUTGenerator:
         
         return np.clip(r, 0, 1), np.clip(g, 0, 1), np.clip(b, 0, 1)
     
+    def apply_vibrance_adjustment(self, r, g, b, vibrance):
+        """Apply vibrance adjustment (-100 to +100), strongest on muted colors"""
+        vibrance_factor = vibrance / 100.0
+        
+        # Already saturated colors are pushed less than muted ones
+        saturation = np.maximum(np.maximum(r, g), b) - np.minimum(np.minimum(r, g), b)
+        sat_factor = 1.0 + vibrance_factor * (1.0 - saturation)
+        
+        luma = 0.299 * r + 0.587 * g + 0.114 * b
+        r = luma + (r - luma) * sat_factor
+        g = luma + (g - luma) * sat_factor
+        b = luma + (b - luma) * sat_factor
+        
+        return np.clip(r, 0, 1), np.clip(g, 0, 1), np.clip(b, 0, 1)
+    
+    def apply_tone_curve(self, r, g, b, stage, amount):
+        """Map each channel through the precomputed 1D curve for a tone stage
+        
+        ``amount`` may be a scalar or a stacked (M, 1, 1, 1) array, in which
+        case each item is looked up in its own curve.
+        """
+        if np.ndim(amount) == 0:
+            curve = tone_curve(stage, float(amount))
+            return lookup_curve(r, curve), lookup_curve(g, curve), lookup_curve(b, curve)
+        amounts = np.asarray(amount)
+        shape = np.broadcast_shapes(np.shape(r), np.shape(g), np.shape(b), amounts.shape)
+        channels = [np.broadcast_to(c, shape) for c in (r, g, b)]
+        results = [np.empty(shape) for _ in channels]
+        for i, value in enumerate(amounts.reshape(-1)):
+            curve = tone_curve(stage, float(value))
+            for channel, result in zip(channels, results):
+                result[i] = lookup_curve(channel[i], curve)
+        return tuple(results)
+    
+    def apply_highlights_adjustment(self, r, g, b, highlights):
+        """Apply highlights adjustment (-100 to +100)"""
+        return self.apply_tone_curve(r, g, b, 'highlights', highlights)
+    
+    def apply_shadows_adjustment(self, r, g, b, shadows):
+        """Apply shadows adjustment (-100 to +100)"""
+        return self.apply_tone_curve(r, g, b, 'shadows', shadows)
+    
+    def apply_whites_adjustment(self, r, g, b, whites):
+        """Apply white point adjustment (-100 to +100)"""
+        return self.apply_tone_curve(r, g, b, 'whites', whites)
+    
+    def apply_blacks_adjustment(self, r, g, b, blacks):
+        """Apply black point adjustment (-100 to +100)"""
+        return self.apply_tone_curve(r, g, b, 'blacks', blacks)
+    
     def apply_color_wheel_adjustment(self, r, g, b, color_wheels):
         """Apply color wheel adjustments for shadows, midtones, highlights"""
         # Calculate luminance to determine shadow/midtone/highlight regions
         luma = 0.299 * r + 0.587 * g + 0.114 * b
         
         # Define region weights
-        shadow_weight = max(0, 1 - luma * 2)  # Stronger in dark areas
-        highlight_weight = max(0, (luma - 0.5) * 2)  # Stronger in bright areas
+        shadow_weight = np.maximum(0, 1 - luma * 2)  # Stronger in dark areas
+        highlight_weight = np.maximum(0, (luma - 0.5) * 2)  # Stronger in bright areas
         midtone_weight = 1 - shadow_weight - highlight_weight  # Remainder
         
         # Apply color wheel adjustments
         if 'shadows' in color_wheels:
             shadow_adj = color_wheels['shadows']
-            r += shadow_adj.get('red', 0) * shadow_weight * 0.1
-            g += shadow_adj.get('green', 0) * shadow_weight * 0.1
-            b += shadow_adj.get('blue', 0) * shadow_weight * 0.1
+            r = r + shadow_adj.get('red', 0) * shadow_weight * 0.1
+            g = g + shadow_adj.get('green', 0) * shadow_weight * 0.1
+            b = b + shadow_adj.get('blue', 0) * shadow_weight * 0.1
         
         if 'midtones' in color_wheels:
             midtone_adj = color_wheels['midtones']
-            r += midtone_adj.get('red', 0) * midtone_weight * 0.1
-            g += midtone_adj.get('green', 0) * midtone_weight * 0.1
-            b += midtone_adj.get('blue', 0) * midtone_weight * 0.1
+            r = r + midtone_adj.get('red', 0) * midtone_weight * 0.1
+            g = g + midtone_adj.get('green', 0) * midtone_weight * 0.1
+            b = b + midtone_adj.get('blue', 0) * midtone_weight * 0.1
         
         if 'highlights' in color_wheels:
             highlight_adj = color_wheels['highlights']
-            r += highlight_adj.get('red', 0) * highlight_weight * 0.1
-            g += highlight_adj.get('green', 0) * highlight_weight * 0.1
-            b += highlight_adj.get('blue', 0) * highlight_weight * 0.1
+            r = r + highlight_adj.get('red', 0) * highlight_weight * 0.1
+            g = g + highlight_adj.get('green', 0) * highlight_weight * 0.1
+            b = b + highlight_adj.get('blue', 0) * highlight_weight * 0.1
         
         return np.clip(r, 0, 1), np.clip(g, 0, 1), np.clip(b, 0, 1)
     
+    def apply_adjustments(self, r, g, b, params, stages=ALL_STAGES, clip=True):
+        """Apply the adjustment stages in ``stage_order`` to scalars or whole arrays
+        
+        Parameters may be scalars or arrays that broadcast against ``r``, ``g``
+        and ``b`` (one value per stacked lattice). A stage is skipped wherever
+        its parameter is zero, and only the stages named in ``stages`` run.
+        Pass ``clip=False`` when more stages will follow.
+        """
+        stage_functions = {
+            'temperature': self.apply_temperature_adjustment,
+            'tint': self.apply_tint_adjustment,
+            'exposure': self.apply_exposure_adjustment,
+            'contrast': self.apply_contrast_adjustment,
+            'highlights': self.apply_highlights_adjustment,
+            'shadows': self.apply_shadows_adjustment,
+            'whites': self.apply_whites_adjustment,
+            'blacks': self.apply_blacks_adjustment,
+            'saturation': self.apply_saturation_adjustment,
+            'vibrance': self.apply_vibrance_adjustment,
+        }
+        for name in self.stage_order:
+            if name not in stages:
+                continue
+            if name == 'color_wheels':
+                if params['color_wheels']:
+                    r, g, b = self.apply_color_wheel_adjustment(r, g, b, params['color_wheels'])
+                continue
+            stage = stage_functions[name]
+            value = params[name]
+            if np.ndim(value) == 0:
+                if value != 0:
+                    r, g, b = stage(r, g, b, value)
+                continue
+            active = value != 0
+            if active.all():
+                r, g, b = stage(r, g, b, value)
+            elif active.any():
+                new_r, new_g, new_b = stage(r, g, b, value)
+                r = np.where(active, new_r, r)
+                g = np.where(active, new_g, g)
+                b = np.where(active, new_b, b)
+        
+        if not clip:
+            return r, g, b
+        # Ensure values are clamped to [0, 1]
+        return np.clip(r, 0.0, 1.0), np.clip(g, 0.0, 1.0), np.clip(b, 0.0, 1.0)
+    
+    def build_identity_lattice(self, dtype=np.float32):
+        """Build the identity lattice as an (N, N, N, 3) array indexed [b, g, r]
+        
+        The axis order matches the .cube data order (red varies fastest), so
+        ``lattice.reshape(-1, 3)`` yields the rows in file order.
+        """
+        ramp = np.arange(self.lut_size, dtype=dtype) / dtype(self.lut_size - 1)
+        b, g, r = np.meshgrid(ramp, ramp, ramp, indexing='ij')
+        return np.stack([r, g, b], axis=-1)
+    
+    def split_separable_run(self, stages=ALL_STAGES):
+        """Split ``stages`` into the leading run of separable stages and the rest
+        
+        Stages are taken in ``stage_order``. The leading run sees channel
+        values that still lie on the lattice grid, so it can be evaluated on
+        one N-entry ramp per channel instead of at every lattice point.
+        """
+        ordered = [name for name in self.stage_order if name in stages]
+        split = next((i for i, name in enumerate(ordered) if name not in SEPARABLE_STAGES), len(ordered))
+        return tuple(ordered[:split]), tuple(ordered[split:])
+    
+    def generate_lattice(self, adjustment_json, stages=ALL_STAGES):
+        """Compute the adjusted (N, N, N, 3) float32 lattice in one batched pass"""
+        return self.generate_lattices([adjustment_json], stages=stages)[0]
+    
+    def generate_shaper(self, adjustment_json, size=SHAPER_SIZE):
+        """Evaluate the per-channel stages on a ``size``-entry ramp
+        
+        Returns a (size, 3) float32 table. Because these stages act on each
+        channel independently, applying this table first and then a lattice
+        built from ``NON_SEPARABLE_STAGES`` reproduces the full adjustment,
+        provided ``stage_order`` runs every separable stage first.
+        """
+        positions = [self.stage_order.index(name) for name in SEPARABLE_STAGES if name in self.stage_order]
+        if positions and any(self.stage_order.index(name) < max(positions)
+                             for name in NON_SEPARABLE_STAGES if name in self.stage_order):
+            raise ValueError("A shaper needs every separable stage ordered before the non-separable ones")
+        params = parse_adjustments(adjustment_json)
+        ramp = np.linspace(0.0, 1.0, size)
+        r, g, b = self.apply_adjustments(ramp, ramp, ramp, params, stages=SEPARABLE_STAGES)
+        return np.stack([r, g, b], axis=-1).astype(np.float32)
+    
+    def generate_lattices(self, adjustment_jsons, group_points=LATTICE_GROUP_POINTS, stages=ALL_STAGES):
+        """Compute an (M, N, N, N, 3) float32 stack of lattices, one per adjustment set
+        
+        Adjustment sets are processed in groups of about ``group_points``
+        lattice points: each group's parameters are stacked into (M, 1, 1, 1)
+        arrays and every stage runs once over the whole group. The leading
+        run of separable stages is collapsed into three per-channel tables
+        of length N, so only the remaining stages are evaluated at all N³
+        points. Arithmetic is done in float64 so a lattice is identical
+        whichever group it was computed in, and to the per-voxel reference.
+        """
+        size = self.lut_size
+        ramp = np.arange(size, dtype=np.float64) / (size - 1)
+        separable, remaining = self.split_separable_run(stages)
+        group_size = max(1, group_points // size ** 3)
+        lattices = np.empty((len(adjustment_jsons), size, size, size, 3), dtype=np.float32)
+        for start in range(0, len(adjustment_jsons), group_size):
+            group = [parse_adjustments(j) for j in adjustment_jsons[start:start + group_size]]
+            params = stack_adjustments(group)
+            tables = self.apply_adjustments(ramp, ramp, ramp, params, stages=separable, clip=False)
+            r_table, g_table, b_table = (np.broadcast_to(t, (len(group), 1, 1, size)).reshape(-1, size) for t in tables)
+            # Lattices are indexed [b, g, r]: each table varies along its own axis
+            r, g, b = self.apply_adjustments(
+                r_table[:, None, None, :], g_table[:, None, :, None], b_table[:, :, None, None],
+                params, stages=remaining,
+            )
+            shape = (len(group), size, size, size)
+            lattices[start:start + len(group), ..., 0] = np.broadcast_to(r, shape)
+            lattices[start:start + len(group), ..., 1] = np.broadcast_to(g, shape)
+            lattices[start:start + len(group), ..., 2] = np.broadcast_to(b, shape)
+        return lattices
+    
+    def generate_lattice_incremental(self, adjustment_json, checkpoints=None):
+        """Compute a lattice, resuming from an earlier call's intermediate results
+
+        Returns ``(lattice, checkpoints, reused)``. ``checkpoints`` holds the
+        channel state after the leading separable run and after each later
+        stage, tagged with the parameters that produced it. Passing it back
+        with new adjustments restarts from the last checkpoint whose stages
+        are unchanged, so a tweak to e.g. the color wheels does not redo
+        saturation and vibrance. ``reused`` counts the stages skipped. The
+        lattice is identical to ``generate_lattice``.
+        """
+        size = self.lut_size
+        params = parse_adjustments(adjustment_json)
+        separable, remaining = self.split_separable_run()
+        signatures = [stage_signature(params, name) for name in separable + remaining]
+
+        resume = -1
+        for index, (signature, _) in enumerate(checkpoints or []):
+            if signature != tuple(signatures[:len(separable) + index]):
+                break
+            resume = index
+
+        if resume < 0:
+            ramp = np.arange(size, dtype=np.float64) / (size - 1)
+            r, g, b = self.apply_adjustments(ramp, ramp, ramp, params, stages=separable, clip=False)
+            # Lattices are indexed [b, g, r]: each table varies along its own axis
+            state = (np.broadcast_to(r, (size,))[None, None, :],
+                     np.broadcast_to(g, (size,))[None, :, None],
+                     np.broadcast_to(b, (size,))[:, None, None])
+            checkpoints = [(tuple(signatures[:len(separable)]), state)]
+            resume = reused = 0
+        else:
+            checkpoints = list(checkpoints[:resume + 1])
+            reused = len(separable) + resume
+
+        r, g, b = checkpoints[resume][1]
+        for index in range(resume, len(remaining)):
+            r, g, b = self.apply_adjustments(r, g, b, params, stages=(remaining[index],), clip=False)
+            checkpoints.append((tuple(signatures[:len(separable) + index + 1]), (r, g, b)))
+
+        lattice = np.empty((size, size, size, 3), dtype=np.float32)
+        for channel, values in enumerate((r, g, b)):
+            lattice[..., channel] = np.broadcast_to(np.clip(values, 0.0, 1.0), (size, size, size))
+        return lattice, checkpoints, reused
+
+    def generate_lattice_reference(self, adjustment_json):
+        """Compute the lattice with a per-voxel loop over plain Python floats
+        
+        Every stage is written out with scalar min/max arithmetic, as the
+        original generator was, so the loop pays no NumPy dispatch per voxel.
+        Kept as the parity reference for ``generate_lattice`` and as the
+        benchmarks' baseline; it is far too slow for the request path.
+        """
+        params = parse_adjustments(adjustment_json)
+        curves = {stage: tone_curve(stage, params[stage]).tolist() for stage in TONE_STAGES if params[stage] != 0}
+        stages = [
+            name for name in self.stage_order
+            if (params['color_wheels'] if name == 'color_wheels' else params[name] != 0)
+        ]
+        size = self.lut_size
+        lattice = np.empty((size, size, size, 3), dtype=np.float32)
+        for b_idx in range(size):
+            for g_idx in range(size):
+                for r_idx in range(size):
+                    # Normalized RGB values (0.0 to 1.0)
+                    r = r_idx / (size - 1)
+                    g = g_idx / (size - 1)
+                    b = b_idx / (size - 1)
+                    for name in stages:
+                        r, g, b = _reference_stage(name, r, g, b, params, curves)
+                    lattice[b_idx, g_idx, r_idx] = (max(0.0, min(1.0, r)), max(0.0, min(1.0, g)), max(0.0, min(1.0, b)))
+        return lattice
+    
+    def cube_header(self, adjustment_json):
+        """Return the .cube header lines for the given adjustments"""
+        base_style = adjustment_json.get('base_style', 'AI Generated LUT')
+        description = adjustment_json.get('description', 'Generated by Adaptive LUT')
+        params = parse_adjustments(adjustment_json)
+        # Composed or imported LUTs carry no adjustments to summarize
+        summary = (
+            f"# Temperature: {params['temperature']}, Contrast: {params['contrast']}, Saturation: {params['saturation']}\n"
+            if 'adjustments' in adjustment_json else ""
+        )
+        return (
+            f"TITLE \"{base_style}\"\n"
+            f"# {description}\n"
+            f"# Generated by Adaptive LUT - AI-Powered Color Grading\n"
+            f"{summary}"
+            f"LUT_3D_SIZE {self.lut_size}\n"
+            "DOMAIN_MIN 0.0 0.0 0.0\n"
+            "DOMAIN_MAX 1.0 1.0 1.0\n"
+            "\n"
+        )
+    
+    def write_cube(self, adjustment_json, output, lattice=None):
+        """Write the .cube for ``adjustment_json`` to a path or file object
+        
+        ``output`` may be a filesystem path, a text stream or a binary stream
+        such as ``io.BytesIO``. Pass ``lattice`` to reuse one already computed.
+        """
+        if lattice is None:
+            lattice = self.generate_lattice(adjustment_json)
+        header = self.cube_header(adjustment_json)
+        if isinstance(output, (str, os.PathLike)):
+            with open(output, "w") as f:
+                write_cube_data(f, header, lattice)
+        else:
+            write_cube_data(output, header, lattice)
+        return output
+    
     def generate_cube_from_json(self, adjustment_json, output_path=None, title=None):
         """Generate a .cube LUT file with real color adjustments"""
         if output_path is None:
@@ -107,77 +415,299 @@ class LUTGenerator:
             output_path = f"static/luts/adaptive_lut_{timestamp}.cube"
         
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        
-        # Extract adjustments
-        adjustments = adjustment_json.get('adjustments', {})
-        color_wheels = adjustment_json.get('color_wheels', {})
-        base_style = adjustment_json.get('base_style', 'AI Generated LUT')
-        description = adjustment_json.get('description', 'Generated by Adaptive LUT')
-        
-        # Parse numeric values safely
-        def safe_float(value, default=0.0):
-            try:
-                if isinstance(value, str):
-                    return float(value.replace('+', ''))
-                return float(value)
-            except:
-                return default
-        
-        temperature = safe_float(adjustments.get('temperature', 0))
-        tint = safe_float(adjustments.get('tint', 0))
-        exposure = safe_float(adjustments.get('exposure', 0))
-        contrast = safe_float(adjustments.get('contrast', 0))
-        saturation = safe_float(adjustments.get('saturation', 0))
-        
-        # Write .cube file header
-        with open(output_path, "w") as f:
-            f.write(f"TITLE \"{base_style}\"\n")
-            f.write(f"# {description}\n")
-            f.write(f"# Generated by Adaptive LUT - AI-Powered Color Grading\n")
-            f.write(f"# Temperature: {temperature}, Contrast: {contrast}, Saturation: {saturation}\n")
-            f.write(f"LUT_3D_SIZE {self.lut_size}\n")
-            f.write("DOMAIN_MIN 0.0 0.0 0.0\n")
-            f.write("DOMAIN_MAX 1.0 1.0 1.0\n")
-            f.write("\n")
-            
-            # Generate LUT data with actual color transformations
-            for b_idx in range(self.lut_size):
-                for g_idx in range(self.lut_size):
-                    for r_idx in range(self.lut_size):
-                        # Normalized RGB values (0.0 to 1.0)
-                        r = r_idx / (self.lut_size - 1)
-                        g = g_idx / (self.lut_size - 1)
-                        b = b_idx / (self.lut_size - 1)
-                        
-                        # Apply adjustments in order
-                        if temperature != 0:
-                            r, g, b = self.apply_temperature_adjustment(r, g, b, temperature)
-                        
-                        if tint != 0:
-                            r, g, b = self.apply_tint_adjustment(r, g, b, tint)
-                        
-                        if exposure != 0:
-                            r, g, b = self.apply_exposure_adjustment(r, g, b, exposure)
-                        
-                        if contrast != 0:
-                            r, g, b = self.apply_contrast_adjustment(r, g, b, contrast)
-                        
-                        if saturation != 0:
-                            r, g, b = self.apply_saturation_adjustment(r, g, b, saturation)
-                        
-                        if color_wheels:
-                            r, g, b = self.apply_color_wheel_adjustment(r, g, b, color_wheels)
-                        
-                        # Ensure values are clamped to [0, 1]
-                        r = max(0.0, min(1.0, r))
-                        g = max(0.0, min(1.0, g))
-                        b = max(0.0, min(1.0, b))
-                        
-                        f.write(f"{r:.6f} {g:.6f} {b:.6f}\n")
-        
+        self.write_cube(adjustment_json, output_path)
         return output_path
+    
+    def generate_cube_bytes(self, adjustment_json, lattice=None):
+        """Render the .cube for ``adjustment_json`` into memory"""
+        buffer = io.BytesIO()
+        self.write_cube(adjustment_json, buffer, lattice=lattice)
+        buffer.seek(0)
+        return buffer
+
+def iter_cube_rows(lattice, chunk_rows=CUBE_CHUNK_ROWS):
+    """Yield the lattice data as preformatted text blocks of ``chunk_rows`` lines
+    
+    Each block is formatted with a single %-operation over a flat list of
+    floats, which produces the same text as formatting every row with
+    ``f"{r:.6f} {g:.6f} {b:.6f}"`` at a fraction of the cost.
+    """
+    rows = lattice.reshape(-1, 3)
+    for start in range(0, len(rows), chunk_rows):
+        chunk = rows[start:start + chunk_rows]
+        yield (CUBE_ROW_FORMAT * len(chunk)) % tuple(chunk.ravel().tolist())
+
+def write_cube_data(f, header, lattice):
+    """Write a .cube header and lattice to a text or binary stream"""
+    binary = isinstance(f, (io.RawIOBase, io.BufferedIOBase))
+    f.write(header.encode() if binary else header)
+    for block in iter_cube_rows(lattice):
+        f.write(block.encode() if binary else block)
+
+def parse_cube(source, max_size=MAX_CUBE_SIZE):
+    """Parse .cube text (str or bytes) into an (N, N, N, 3) float32 lattice
+    
+    Returns ``(lattice, metadata)`` where metadata holds the title and
+    header keywords. Only the handful of header lines are handled in
+    Python; the data block is converted in one NumPy call. A 1D shaper
+    (``LUT_1D_SIZE`` alongside ``LUT_3D_SIZE``) is baked into the lattice.
+    Raises ValueError for a malformed file or a size outside 2..``max_size``.
+    """
+    text = source.decode('utf-8') if isinstance(source, (bytes, bytearray)) else source
+    match = CUBE_DATA_START.search(text)
+    if match is None:
+        raise ValueError("No LUT data found in .cube file")
+    header, data = text[:match.start()], text[match.start():]
+    if '#' in data:
+        data = CUBE_COMMENT.sub('', data)
+    
+    metadata = {}
+    for line in header.splitlines():
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        keyword, _, value = line.partition(' ')
+        metadata[keyword.upper()] = value.strip().strip('"')
+    
+    if 'LUT_3D_SIZE' not in metadata:
+        raise ValueError("Only 3D .cube files are supported (missing LUT_3D_SIZE)")
+    for keyword, expected in (('DOMAIN_MIN', 0.0), ('DOMAIN_MAX', 1.0)):
+        if keyword in metadata and any(float(v) != expected for v in metadata[keyword].split()):
+            raise ValueError(f"Only 0-1 input domains are supported ({keyword} {metadata[keyword]})")
+    
+    try:
+        size = int(metadata['LUT_3D_SIZE'])
+        shaper_size = int(metadata.get('LUT_1D_SIZE', 0))
+    except ValueError as e:
+        raise ValueError(f"Invalid LUT size: {e}")
+    if not 2 <= size <= max_size:
+        raise ValueError(f"LUT_3D_SIZE must be between 2 and {max_size}, got {size}")
+    if shaper_size and not 2 <= shaper_size <= 65536:
+        raise ValueError(f"LUT_1D_SIZE must be between 2 and 65536, got {shaper_size}")
+    try:
+        values = np.array(data.split(), dtype=np.float32)
+    except ValueError as e:
+        raise ValueError(f"Invalid LUT data: {e}")
+    expected_values = (shaper_size + size ** 3) * 3
+    if values.size != expected_values:
+        raise ValueError(
+            f"Expected {shaper_size + size ** 3} rows for LUT_3D_SIZE {size}, found {values.size / 3:g}"
+        )
+    
+    rows = values.reshape(-1, 3)
+    lattice = rows[shaper_size:].reshape(size, size, size, 3)
+    if shaper_size:
+        shaper = rows[:shaper_size]
+        identity = LUTGenerator(lut_size=size).build_identity_lattice()
+        ramp = np.linspace(0.0, 1.0, shaper_size)
+        shaped = np.stack([np.interp(identity[..., c], ramp, shaper[:, c]) for c in range(3)], axis=-1)
+        lattice = _apply_lattice(shaped, lattice)
+    metadata['title'] = metadata.get('TITLE', '')
+    return np.ascontiguousarray(lattice, dtype=np.float32), metadata
+
+def _apply_lattice(rgb, lattice):
+    from lut_apply import apply_lut
+    return apply_lut(rgb, lattice)
+
+def resample_lattice(lattice, size):
+    """Resample an (N, N, N, 3) lattice to ``size`` points per axis
+    
+    Sizes whose grid is a subset of the source grid (65 -> 33 -> 17) are
+    reproduced exactly; other sizes are interpolated.
+    """
+    if lattice.shape[0] == size:
+        return lattice
+    return _apply_lattice(LUTGenerator(lut_size=size).build_identity_lattice(), lattice)
+
+def compose_luts(outer, inner, size=None):
+    """Return the lattice for ``outer ∘ inner``: apply ``inner``, then ``outer``
+    
+    The result has ``size`` points (default: the larger input). Inputs of a
+    different size are sampled by trilinear interpolation.
+    """
+    size = size or max(outer.shape[0], inner.shape[0])
+    return _apply_lattice(resample_lattice(np.asarray(inner, dtype=np.float32), size), outer).astype(np.float32)
+
+def blend_luts(a, b, amount, size=None):
+    """Mix two lattices: ``amount`` 0.0 gives ``a``, 1.0 gives ``b``"""
+    size = size or max(a.shape[0], b.shape[0])
+    a = resample_lattice(np.asarray(a, dtype=np.float32), size)
+    b = resample_lattice(np.asarray(b, dtype=np.float32), size)
+    return np.clip(a + (b - a) * np.float32(amount), 0.0, 1.0).astype(np.float32)
+
+def scale_lut(lattice, strength):
+    """Scale a LUT's effect: 0.0 is the identity, 1.0 the LUT, >1 exaggerates it"""
+    identity = LUTGenerator(lut_size=lattice.shape[0]).build_identity_lattice()
+    return blend_luts(identity, lattice, strength)
+
+def stage_signature(params, stage):
+    """A hashable value identifying what ``stage`` will do under ``params``"""
+    if stage != 'color_wheels':
+        return float(params[stage])
+    return tuple(sorted((region, tuple(sorted(wheel.items()))) for region, wheel in params['color_wheels'].items()))
+
+def _clip(value):
+    return max(0.0, min(1.0, value))
+
+def _reference_curve(value, curve):
+    """Scalar ``lookup_curve``"""
+    position = _clip(value) * (len(curve) - 1)
+    index = min(int(position), len(curve) - 2)
+    return (position - index) * (curve[index + 1] - curve[index]) + curve[index]
+
+def _reference_stage(name, r, g, b, params, curves):
+    """Apply one stage to a single voxel with scalar arithmetic"""
+    if name == 'temperature':
+        factor = params['temperature'] / 100.0
+        if factor > 0:
+            return min(1.0, r + factor * 0.1), g, max(0.0, b - factor * 0.05)
+        return max(0.0, r + factor * 0.05), g, min(1.0, b - factor * 0.1)
+    if name == 'tint':
+        factor = params['tint'] / 100.0
+        if factor > 0:
+            return min(1.0, r + factor * 0.05), max(0.0, g - factor * 0.03), min(1.0, b + factor * 0.05)
+        return max(0.0, r + factor * 0.03), min(1.0, g - factor * 0.05), max(0.0, b + factor * 0.03)
+    if name == 'exposure':
+        factor = 2 ** params['exposure']
+        return _clip(r * factor), _clip(g * factor), _clip(b * factor)
+    if name == 'contrast':
+        factor = 1.0 + (params['contrast'] / 100.0)
+        return _clip(0.5 + (r - 0.5) * factor), _clip(0.5 + (g - 0.5) * factor), _clip(0.5 + (b - 0.5) * factor)
+    if name in TONE_STAGES:
+        curve = curves[name]
+        return _reference_curve(r, curve), _reference_curve(g, curve), _reference_curve(b, curve)
+    if name in ('saturation', 'vibrance'):
+        if name == 'saturation':
+            factor = 1.0 + (params['saturation'] / 100.0)
+        else:
+            factor = 1.0 + params['vibrance'] / 100.0 * (1.0 - (max(r, g, b) - min(r, g, b)))
+        luma = 0.299 * r + 0.587 * g + 0.114 * b
+        return _clip(luma + (r - luma) * factor), _clip(luma + (g - luma) * factor), _clip(luma + (b - luma) * factor)
+    # Color wheels
+    luma = 0.299 * r + 0.587 * g + 0.114 * b
+    shadow_weight = max(0, 1 - luma * 2)
+    highlight_weight = max(0, (luma - 0.5) * 2)
+    weights = {'shadows': shadow_weight, 'midtones': 1 - shadow_weight - highlight_weight, 'highlights': highlight_weight}
+    for region in COLOR_WHEEL_REGIONS:
+        wheel = params['color_wheels'].get(region)
+        if wheel:
+            r = r + wheel.get('red', 0) * weights[region] * 0.1
+            g = g + wheel.get('green', 0) * weights[region] * 0.1
+            b = b + wheel.get('blue', 0) * weights[region] * 0.1
+    return _clip(r), _clip(g), _clip(b)
+
+def safe_float(value, default=0.0):
+    """Parse a numeric adjustment value such as "+15" or 0.5"""
+    try:
+        if isinstance(value, str):
+            return float(value.replace('+', ''))
+        return float(value)
+    except:
+        return default
+
+@lru_cache(maxsize=256)
+def tone_curve(stage, amount, size=TONE_CURVE_SIZE):
+    """Return the read-only ``size``-entry 1D curve for a tone stage
+    
+    Shadows and highlights bend the lower and upper midtones while keeping
+    the end points fixed; blacks and whites move the end points themselves.
+    """
+    x = np.linspace(0.0, 1.0, size)
+    amount_factor = amount / 100.0
+    if stage == 'shadows':
+        # x(1-x)^2 peaks at 4/27 for x = 1/3; scaled so the curve stays monotonic
+        curve = x + amount_factor * 0.14 * 6.75 * x * (1 - x) ** 2
+    elif stage == 'highlights':
+        curve = x + amount_factor * 0.14 * 6.75 * x * x * (1 - x)
+    elif stage == 'whites':
+        curve = x + amount_factor * 0.15 * x ** 3
+    elif stage == 'blacks':
+        curve = x + amount_factor * 0.15 * (1 - x) ** 3
+    else:
+        raise ValueError(f"Unknown tone stage: {stage}")
+    curve = np.clip(curve, 0.0, 1.0)
+    curve.flags.writeable = False
+    return curve
+
+def lookup_curve(values, curve):
+    """Look up 0-1 ``values`` in a uniformly sampled 1D curve with linear interpolation"""
+    position = np.array(values, dtype=np.float64)
+    np.clip(position, 0.0, 1.0, out=position)
+    position *= len(curve) - 1
+    index = position.astype(np.intp)
+    np.minimum(index, len(curve) - 2, out=index)
+    # Reuse the position buffer for the result: curve[i] + slope[i] * fraction
+    position -= index
+    position *= np.take(np.diff(curve), index)
+    position += np.take(curve, index)
+    return position
+
+def parse_adjustments(adjustment_json):
+    """Extract the numeric adjustment parameters from the AI's JSON"""
+    adjustments = adjustment_json.get('adjustments', {})
+    return {
+        'temperature': safe_float(adjustments.get('temperature', 0)),
+        'tint': safe_float(adjustments.get('tint', 0)),
+        'exposure': safe_float(adjustments.get('exposure', 0)),
+        'contrast': safe_float(adjustments.get('contrast', 0)),
+        'saturation': safe_float(adjustments.get('saturation', 0)),
+        'highlights': safe_float(adjustments.get('highlights', 0)),
+        'shadows': safe_float(adjustments.get('shadows', 0)),
+        'whites': safe_float(adjustments.get('whites', 0)),
+        'blacks': safe_float(adjustments.get('blacks', 0)),
+        'vibrance': safe_float(adjustments.get('vibrance', 0)),
+        'color_wheels': parse_color_wheels(adjustment_json.get('color_wheels')),
+    }
+
+def parse_color_wheels(color_wheels):
+    """Normalize color wheels to ``{region: {channel: float}}``
+    
+    Values such as "0.1" become floats; unknown regions and channels,
+    non-object wheels and empty wheels are dropped, so the batched,
+    incremental and reference paths all apply the same wheels.
+    """
+    if not isinstance(color_wheels, dict):
+        return {}
+    normalized = {}
+    for region in COLOR_WHEEL_REGIONS:
+        wheel = color_wheels.get(region)
+        if not isinstance(wheel, dict):
+            continue
+        channels = {channel: safe_float(wheel[channel]) for channel in COLOR_WHEEL_CHANNELS if channel in wheel}
+        if channels:
+            normalized[region] = channels
+    return normalized
+
+def stack_adjustments(params_list):
+    """Stack parsed adjustments into (M, 1, 1, 1) arrays for a batched pass
+    
+    Color wheel values become per-item arrays too, with zero for any region
+    or channel an item does not set.
+    """
+    def column(values):
+        return np.array(values, dtype=np.float64).reshape(-1, 1, 1, 1)
+    
+    stacked = {
+        name: column([p[name] for p in params_list])
+        for name in ALL_STAGES if name != 'color_wheels'
+    }
+    color_wheels = {}
+    for region in COLOR_WHEEL_REGIONS:
+        wheels = [p['color_wheels'].get(region) for p in params_list]
+        if any(wheels):
+            color_wheels[region] = {
+                channel: column([w.get(channel, 0.0) if w else 0.0 for w in wheels])
+                for channel in COLOR_WHEEL_CHANNELS
+            }
+    stacked['color_wheels'] = color_wheels
+    return stacked
 
 def create_lut_from_json(adjustment_json, output_path=None, lut_size=32):
     """Create a LUT file from adjustment JSON"""
     generator = LUTGenerator(lut_size=lut_size)
     return generator.generate_cube_from_json(adjustment_json, output_path)
+
+def create_lut_buffer_from_json(adjustment_json, lut_size=32):
+    """Create a LUT in memory and return it as a BytesIO"""
+    generator = LUTGenerator(lut_size=lut_size)
+    return generator.generate_cube_bytes(adjustment_json)
@@ -0,0 +1,225 @@
+"""Apply LUTs across a pool of worker processes via shared memory.
+
+Pixels are copied once into a shared memory block and every worker grades
+its own range of pixels in place into a second block, so no pixel data is
+pickled. Lattices, and the baked tables of the 8-bit path, are shared the
+same way and each worker attaches to one once, keeping it for later tasks.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+from PIL import Image
+
+from lut_apply import (
+    DEFAULT_CHUNK_PIXELS, INTERPOLATION_METHODS, TABLE_PLANE, apply_lut_to_array, apply_uint8_table, table_lut_size,
+)
+
+# Below this many pixels the IPC round trip costs more than it saves
+MIN_POOL_PIXELS = 1 << 16
+# Lattices and baked tables kept in shared memory by the parent, and attached per worker
+MAX_SHARED_LATTICES = 16
+MAX_WORKER_LATTICES = 8
+
+_worker_lattices = OrderedDict()
+
+def _attach(name):
+    """Attach to a block owned by the parent process
+
+    Pool workers share the parent's resource tracker, so attaching only
+    repeats the parent's registration and the parent's unlink clears it.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+def _free(block):
+    """Close and unlink a block this process created
+
+    Workers still attached keep their mapping; unlinking only drops the name.
+    """
+    block.close()
+    block.unlink()
+
+def _worker_lattice(name, shape, dtype):
+    """Return the lattice or table in block ``name``, attaching on first use in this worker"""
+    if name in _worker_lattices:
+        _worker_lattices.move_to_end(name)
+        return _worker_lattices[name][1]
+    block = _attach(name)
+    lattice = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    _worker_lattices[name] = (block, lattice)
+    while len(_worker_lattices) > MAX_WORKER_LATTICES:
+        old_block, old_lattice = _worker_lattices.popitem(last=False)[1]
+        del old_lattice
+        old_block.close()
+    return lattice
+
+def _apply_range(task):
+    """Grade pixels [start, stop) of the shared input block into the output block
+
+    ``method`` "uint8" maps the pixels through a baked table instead of
+    interpolating a lattice.
+    """
+    in_name, out_name, count, start, stop, lattice_name, lut_size, method, chunk_pixels = task
+    if method == "uint8":
+        table = _worker_lattice(lattice_name, (lut_size * TABLE_PLANE,), np.uint32)
+    else:
+        lattice = _worker_lattice(lattice_name, (lut_size, lut_size, lut_size, 3), np.float32)
+    source, target = _attach(in_name), _attach(out_name)
+    try:
+        pixels = np.ndarray((count, 3), dtype=np.uint8, buffer=source.buf)
+        out = np.ndarray((count, 3), dtype=np.uint8, buffer=target.buf)
+        if method == "uint8":
+            out[start:stop] = apply_uint8_table(pixels[start:stop], table, chunk_pixels=chunk_pixels)
+        else:
+            out[start:stop] = apply_lut_to_array(pixels[start:stop], lattice, method=method, chunk_pixels=chunk_pixels)
+        # Views must be released before the blocks can be closed
+        del pixels, out
+    finally:
+        source.close()
+        target.close()
+    return stop - start
+
+class LUTProcessPool:
+    """Process pool that applies LUTs to uint8 RGB arrays through shared memory
+
+    Work is split into one contiguous pixel range per worker (or per
+    ``chunk_pixels`` when that is smaller), so any (..., 3) array works:
+    a still, a tile or a (B, H, W, 3) batch of frames.
+    """
+
+    def __init__(self, workers=None, chunk_pixels=DEFAULT_CHUNK_PIXELS, min_pixels=MIN_POOL_PIXELS):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_pixels = chunk_pixels
+        self.min_pixels = min_pixels
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._lattices = OrderedDict()
+        # Pending calls per lattice block; evicted blocks still in use wait in _retired
+        self._users = {}
+        self._retired = {}
+        self._lock = threading.Lock()
+        self.tasks = 0
+        self.inline = 0
+
+    def _share_lattice(self, lattice, key):
+        """Return the shared block holding ``lattice``, copying it in on first use
+
+        The caller holds a reference until it calls ``_release``. A block
+        evicted while referenced is only unlinked once released, so its name
+        stays valid for tasks that have not attached yet.
+        """
+        table = np.ascontiguousarray(lattice)
+        if key is None:
+            key = hashlib.sha256(table.tobytes()).hexdigest()
+        key = (table.dtype.str, key)
+        with self._lock:
+            if key in self._lattices:
+                self._lattices.move_to_end(key)
+                block = self._lattices[key]
+            else:
+                block = shared_memory.SharedMemory(create=True, size=table.nbytes)
+                np.ndarray(table.shape, dtype=table.dtype, buffer=block.buf)[...] = table
+                self._lattices[key] = block
+                while len(self._lattices) > MAX_SHARED_LATTICES:
+                    old = self._lattices.popitem(last=False)[1]
+                    if self._users.get(old.name):
+                        self._retired[old.name] = old
+                    else:
+                        _free(old)
+            self._users[block.name] = self._users.get(block.name, 0) + 1
+            return block
+
+    def _release(self, block):
+        """Drop a reference taken by ``_share_lattice``, unlinking a retired block at zero"""
+        with self._lock:
+            self._users[block.name] -= 1
+            if self._users[block.name] == 0:
+                del self._users[block.name]
+                retired = self._retired.pop(block.name, None)
+                if retired is not None:
+                    _free(retired)
+
+    def apply(self, pixels, lattice, method="trilinear", key=None):
+        """Apply ``lattice`` to an (..., 3) uint8 array and return a new uint8 array
+
+        ``key`` identifies the lattice (e.g. its LUT cache key) so it is shared
+        with the workers only once; without it the lattice bytes are hashed.
+        """
+        if method not in INTERPOLATION_METHODS:
+            raise ValueError(f"Unknown interpolation method: {method}")
+        count = pixels.size // 3
+        if count < self.min_pixels or self.workers == 1:
+            self.inline += 1
+            return apply_lut_to_array(pixels, lattice, method=method, chunk_pixels=self.chunk_pixels)
+        lattice = np.asarray(lattice, dtype=np.float32)
+        block = self._share_lattice(lattice, key)
+        try:
+            return self._map(pixels, block, lattice.shape[0], method)
+        finally:
+            self._release(block)
+
+    def apply_table(self, pixels, table, key=None):
+        """Map an (..., 3) uint8 array through a table from ``bake_uint8_table``"""
+        count = pixels.size // 3
+        if count < self.min_pixels or self.workers == 1:
+            self.inline += 1
+            return apply_uint8_table(pixels, table, chunk_pixels=self.chunk_pixels)
+        block = self._share_lattice(table, key)
+        try:
+            return self._map(pixels, block, table_lut_size(table), "uint8")
+        finally:
+            self._release(block)
+
+    def _map(self, pixels, lattice_block, lut_size, method):
+        """Split the pixels into ranges and grade them on the workers"""
+        count = pixels.size // 3
+        source = shared_memory.SharedMemory(create=True, size=pixels.nbytes)
+        target = shared_memory.SharedMemory(create=True, size=pixels.nbytes)
+        try:
+            np.ndarray(pixels.shape, dtype=np.uint8, buffer=source.buf)[...] = pixels
+            step = min(self.chunk_pixels, -(-count // self.workers))
+            tasks = [
+                (source.name, target.name, count, start, min(start + step, count),
+                 lattice_block.name, lut_size, method, self.chunk_pixels)
+                for start in range(0, count, step)
+            ]
+            list(self._executor.map(_apply_range, tasks))
+            self.tasks += len(tasks)
+            return np.ndarray(pixels.shape, dtype=np.uint8, buffer=target.buf).copy()
+        finally:
+            _free(source)
+            _free(target)
+
+    def apply_to_image(self, img, lattice, method="trilinear", key=None):
+        """Apply a LUT to a PIL image and return a new RGB image"""
+        pixels = np.asarray(img.convert('RGB'))
+        return Image.fromarray(self.apply(pixels, lattice, method=method, key=key), 'RGB')
+
+    def apply_table_to_image(self, img, table, key=None):
+        """Map a PIL image through a baked 8-bit table and return a new RGB image"""
+        pixels = np.asarray(img.convert('RGB'))
+        return Image.fromarray(self.apply_table(pixels, table, key=key), 'RGB')
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "shared_lattices": len(self._lattices),
+                "retired_lattices": len(self._retired),
+                "tasks": self.tasks,
+                "inline": self.inline,
+            }
+
+    def shutdown(self):
+        self._executor.shutdown()
+        with self._lock:
+            for block in list(self._lattices.values()) + list(self._retired.values()):
+                _free(block)
+            self._lattices.clear()
+            self._retired.clear()
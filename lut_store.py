@@ -0,0 +1,73 @@
+"""Compact binary LUT sidecar files (.alut) that can be memory-mapped.
+
+Layout (little-endian):
+
+    offset  size  field
+    0       4     magic b"ALUT"
+    4       2     format version (1)
+    6       1     dtype code (0 = float32, 1 = float16)
+    7       1     reserved
+    8       4     lattice size N
+    12      4     metadata length M
+    16      M     UTF-8 JSON metadata (instructions, title, ...)
+    ...           zero padding to a 64-byte boundary
+    data    -     N * N * N * 3 lattice values indexed [b, g, r, channel]
+"""
+import json
+import os
+import struct
+import threading
+
+import numpy as np
+
+MAGIC = b"ALUT"
+VERSION = 1
+HEADER = struct.Struct("<4sHBxII")
+DATA_ALIGNMENT = 64
+DTYPE_CODES = {np.dtype(np.float32): 0, np.dtype(np.float16): 1}
+CODE_DTYPES = {code: dtype for dtype, code in DTYPE_CODES.items()}
+SIDECAR_EXTENSION = ".alut"
+
+def _data_offset(metadata_length):
+    end = HEADER.size + metadata_length
+    return (end + DATA_ALIGNMENT - 1) // DATA_ALIGNMENT * DATA_ALIGNMENT
+
+def save_lut(path, lattice, metadata=None, dtype=np.float32):
+    """Write ``lattice`` and JSON ``metadata`` to a sidecar file atomically"""
+    dtype = np.dtype(dtype)
+    if dtype not in DTYPE_CODES:
+        raise ValueError(f"Unsupported sidecar dtype: {dtype}")
+    size = lattice.shape[0]
+    meta = json.dumps(metadata or {}).encode("utf-8")
+    offset = _data_offset(len(meta))
+
+    # Per-writer staging file: concurrent writers of one key must not share it
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, DTYPE_CODES[dtype], size, len(meta)))
+        f.write(meta)
+        f.write(b"\0" * (offset - HEADER.size - len(meta)))
+        f.write(np.ascontiguousarray(lattice, dtype=dtype.newbyteorder("<")).tobytes())
+    os.replace(tmp_path, path)
+    return path
+
+def read_header(path):
+    """Return (size, dtype, metadata, data offset) from a sidecar file"""
+    with open(path, "rb") as f:
+        magic, version, dtype_code, size, meta_length = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an ALUT sidecar")
+        if version != VERSION:
+            raise ValueError(f"Unsupported ALUT version {version} in {path}")
+        metadata = json.loads(f.read(meta_length).decode("utf-8"))
+    return size, CODE_DTYPES[dtype_code], metadata, _data_offset(meta_length)
+
+def load_lut(path):
+    """Memory-map a sidecar and return (lattice, metadata)
+
+    The lattice is a read-only ``np.memmap`` of shape (N, N, N, 3); float16
+    sidecars are returned as float16 and can be cast as needed.
+    """
+    size, dtype, metadata, offset = read_header(path)
+    lattice = np.memmap(path, dtype=dtype.newbyteorder("<"), mode="r", offset=offset, shape=(size, size, size, 3))
+    return lattice, metadata
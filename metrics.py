@@ -0,0 +1,146 @@
+"""In-process counters and histograms rendered in the Prometheus text format.
+
+``Metrics.stage(name)`` times a block of work into the stage histogram and,
+when a request is being tracked on the current thread, into that request's
+timings so they can be returned in a ``Server-Timing`` header.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIX = "adaptive_lut_"
+# Upper bounds in seconds; the last bucket is +Inf
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRIC_HELP = {
+    "requests_total": ("counter", "HTTP requests by endpoint, method and status"),
+    "request_duration_seconds": ("histogram", "HTTP request latency by endpoint"),
+    "stage_duration_seconds": ("histogram", "Time spent in each pipeline stage"),
+    "errors_total": ("counter", "Errors by type"),
+    "analysis_path_total": ("counter", "Analyses by path: local preset, statistics + thumbnail, or full vision"),
+    "request_bytes_total": ("counter", "Request body bytes received"),
+    "response_bytes_total": ("counter", "Response body bytes sent"),
+    "cache_hits_total": ("counter", "Cache hits by cache"),
+    "cache_misses_total": ("counter", "Cache misses by cache"),
+}
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metrics:
+    """Thread-safe registry of labelled counters and histograms
+
+    Values are per process; under gunicorn each worker keeps and reports
+    its own. ``add_collector`` registers a callable returning
+    ``[(name, labels_dict, value)]`` for counters owned by other objects,
+    such as cache hit counts, read at render time.
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def inc(self, name, labels=None, value=1):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, labels=None):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram["buckets"][index] += 1
+                    break
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+    def error(self, error_type):
+        self.inc("errors_total", {"type": error_type})
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as pipeline stage ``name``"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe("stage_duration_seconds", elapsed, {"stage": name})
+            timings = getattr(self._local, "timings", None)
+            if timings is not None:
+                timings.append((name, elapsed))
+
+    def begin_request(self):
+        """Start collecting stage timings for the request on this thread"""
+        self._local.timings = []
+        self._local.started = time.perf_counter()
+
+    def end_request(self):
+        """Stop collecting and return ``(total_seconds, [(stage, seconds)])``"""
+        timings = getattr(self._local, "timings", None) or []
+        started = getattr(self._local, "started", None)
+        self._local.timings = None
+        self._local.started = None
+        return (time.perf_counter() - started if started is not None else 0.0), timings
+
+    @staticmethod
+    def server_timing(total, timings):
+        """Format stage timings as a ``Server-Timing`` header value"""
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings]
+        entries.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(entries)
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format"""
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: dict(value, buckets=list(value["buckets"])) for key, value in self._histograms.items()}
+        for collector in self._collectors:
+            for name, labels, value in collector():
+                key = (name, tuple(sorted(labels.items())))
+                counters[key] = counters.get(key, 0) + value
+
+        lines = []
+        families = {}
+        for key in counters:
+            families.setdefault(key[0], []).append(key)
+        for key in histograms:
+            families.setdefault(key[0], []).append(key)
+        for name in sorted(families):
+            kind, help_text = METRIC_HELP.get(name, ("untyped", name))
+            lines.append(f"# HELP {PREFIX}{name} {help_text}")
+            lines.append(f"# TYPE {PREFIX}{name} {kind}")
+            for key in sorted(families[name]):
+                labels = list(key[1])
+                if key in counters:
+                    lines.append(f"{PREFIX}{name}{_label_text(labels)} {_number(counters[key])}")
+                    continue
+                histogram = histograms[key]
+                cumulative = 0
+                for bound, count in zip(self.buckets, histogram["buckets"]):
+                    cumulative += count
+                    lines.append(f"{PREFIX}{name}_bucket{_label_text(labels + [('le', bound)])} {cumulative}")
+                lines.append(f"{PREFIX}{name}_bucket{_label_text(labels + [('le', '+Inf')])} {histogram['count']}")
+                lines.append(f"{PREFIX}{name}_sum{_label_text(labels)} {_number(histogram['sum'])}")
+                lines.append(f"{PREFIX}{name}_count{_label_text(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,171 @@
+"""Preview variants (several widths, JPEG and WebP) with content-hashed names.
+
+The LUT is applied once, at the largest requested width, and every smaller
+variant is downscaled from that graded image. File names embed a hash of
+the encoded bytes, so a name always refers to the same content and can be
+cached by browsers forever.
+
+Full-size variants are deferred: the request only records a recipe (the
+upload and the LUT to apply) under the variant's final name, and the image
+is rendered on the first GET. Their names hash the recipe's inputs instead
+of the output bytes, which identifies the content just as well.
+"""
+import hashlib
+import io
+import json
+import os
+import threading
+
+from PIL import Image, ImageOps, features
+
+# (variant name, maximum width); None keeps the source width
+PREVIEW_VARIANTS = (("thumb", 256), ("medium", 800), ("full", None))
+# Rendered while the request waits; the rest are rendered when first fetched
+EAGER_VARIANTS = (("thumb", 256), ("medium", 800))
+DEFERRED_VARIANTS = (("full", None),)
+PREVIEW_FORMATS = ("jpeg", "webp")
+PREVIEW_DIRECTORY = "static/previews"
+FORMAT_EXTENSIONS = {"jpeg": "jpg", "webp": "webp"}
+FORMAT_MIMETYPES = {"jpg": "image/jpeg", "webp": "image/webp"}
+# Hex digits of the content hash kept in file names and ETags
+DIGEST_LENGTH = 20
+
+def _fitted_size(size, width):
+    if width is None or size[0] <= width:
+        return size
+    return width, max(1, round(size[1] * width / size[0]))
+
+def _fit_width(img, width):
+    size = _fitted_size(img.size, width)
+    if size == img.size:
+        return img
+    return img.resize(size, Image.Resampling.LANCZOS)
+
+def _supported_formats(formats):
+    if "webp" in formats and not features.check("webp"):
+        return tuple(f for f in formats if f != "webp")
+    return formats
+
+def _write_atomic(path, data):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def _encode(img, image_format, quality):
+    buffer = io.BytesIO()
+    if image_format == "jpeg":
+        img.save(buffer, "JPEG", quality=quality, optimize=True, progressive=True)
+    else:
+        img.save(buffer, "WEBP", quality=quality, method=4)
+    return buffer.getvalue()
+
+def render_preview_variants(img, grade, variants=PREVIEW_VARIANTS, formats=PREVIEW_FORMATS, quality=85):
+    """Grade ``img`` once and encode every variant in every format
+
+    ``grade`` maps a PIL image to its graded PIL image. Returns a list of
+    dicts with the variant name, format, size, encoded bytes and digest.
+    WebP is skipped when Pillow was built without it.
+    """
+    formats = _supported_formats(formats)
+    widths = [width for _, width in variants]
+    largest = None if None in widths else max(widths)
+    graded = grade(_fit_width(img, largest))
+
+    rendered = []
+    for name, width in variants:
+        variant = _fit_width(graded, width)
+        for image_format in formats:
+            data = _encode(variant, image_format, quality)
+            rendered.append({
+                "variant": name,
+                "format": image_format,
+                "width": variant.width,
+                "height": variant.height,
+                "data": data,
+                "digest": hashlib.sha256(data).hexdigest()[:DIGEST_LENGTH],
+            })
+    return rendered
+
+def preview_filename(rendered):
+    return f"{rendered['variant']}_{rendered['digest']}.{FORMAT_EXTENSIONS[rendered['format']]}"
+
+def save_preview_variants(rendered, directory=PREVIEW_DIRECTORY):
+    """Write rendered variants under their content-hashed names
+
+    Returns ``{variant: {format: file name, "width": .., "height": ..}}``.
+    A name that already exists holds identical bytes and is not rewritten.
+    """
+    os.makedirs(directory, exist_ok=True)
+    saved = {}
+    for item in rendered:
+        filename = preview_filename(item)
+        path = os.path.join(directory, filename)
+        if not os.path.exists(path):
+            _write_atomic(path, item["data"])
+        entry = saved.setdefault(item["variant"], {"width": item["width"], "height": item["height"]})
+        entry[item["format"]] = filename
+    return saved
+
+def defer_preview_variants(source, size, lut_file, lut_key, variants=DEFERRED_VARIANTS, formats=PREVIEW_FORMATS,
+                           quality=85, directory=PREVIEW_DIRECTORY):
+    """Record recipes to render ``variants`` of the upload ``source`` later
+
+    ``source`` is the uploaded file's bytes and ``size`` its decoded size.
+    The upload is written once under its own hash; each variant and format
+    gets a ``<name>.json`` recipe next to the file it will become. Returns
+    the same shape as ``save_preview_variants``.
+    """
+    os.makedirs(directory, exist_ok=True)
+    source_name = f"source_{hashlib.sha256(source).hexdigest()[:DIGEST_LENGTH]}.upload"
+    source_path = os.path.join(directory, source_name)
+    if not os.path.exists(source_path):
+        _write_atomic(source_path, source)
+
+    saved = {}
+    for name, width in variants:
+        fitted = _fitted_size(size, width)
+        entry = saved.setdefault(name, {"width": fitted[0], "height": fitted[1]})
+        for image_format in _supported_formats(formats):
+            recipe = {
+                "source": source_name,
+                "lut_file": lut_file,
+                "lut_key": lut_key,
+                "variant": name,
+                "width": width,
+                "format": image_format,
+                "quality": quality,
+            }
+            digest = hashlib.sha256(json.dumps(recipe, sort_keys=True).encode()).hexdigest()[:DIGEST_LENGTH]
+            filename = preview_filename({"variant": name, "digest": digest, "format": image_format})
+            recipe_path = os.path.join(directory, f"{filename}.json")
+            if not os.path.exists(recipe_path):
+                _write_atomic(recipe_path, json.dumps(recipe).encode())
+            entry[image_format] = filename
+    return saved
+
+def render_deferred_preview(filename, grade, directory=PREVIEW_DIRECTORY):
+    """Render a deferred variant from its recipe and save it under ``filename``
+
+    ``grade`` maps a PIL image and a LUT file name to the graded image.
+    Returns the path, or None when there is no recipe or its upload has
+    since been evicted. Concurrent first requests may both render; the
+    results are identical and the last rename wins.
+    """
+    try:
+        with open(os.path.join(directory, f"{filename}.json"), "rb") as f:
+            recipe = json.load(f)
+        with open(os.path.join(directory, recipe["source"]), "rb") as f:
+            source = f.read()
+    except FileNotFoundError:
+        return None
+    img = ImageOps.exif_transpose(Image.open(io.BytesIO(source))).convert("RGB")
+    graded = grade(_fit_width(img, recipe["width"]), recipe["lut_file"])
+    path = os.path.join(directory, filename)
+    _write_atomic(path, _encode(graded, recipe["format"], recipe["quality"]))
+    return path
+
+def etag_for(filename):
+    """The strong ETag of a preview file: the content digest in its name"""
+    stem = os.path.splitext(filename)[0]
+    return stem.rsplit("_", 1)[-1]
@@ -0,0 +1,21 @@
+import importlib
+import os
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    """The Flask app imported in a scratch directory, with no real OpenAI key"""
+    workdir = tmp_path_factory.mktemp("app")
+    cwd = os.getcwd()
+    os.environ.update({
+        "OPENAI_API_KEY": "test-key",
+        "JANITOR_INTERVAL": "0",
+        "ANALYSIS_CACHE_PATH": str(workdir / "analysis_cache.sqlite3"),
+    })
+    os.chdir(workdir)
+    try:
+        yield importlib.import_module("app")
+    finally:
+        os.chdir(cwd)
@@ -0,0 +1,98 @@
+import threading
+import time
+
+import pytest
+
+from analysis_cache import AnalysisCache
+from benchmarks.fake_openai import FakeOpenAIClient
+from benchmarks.load_test import sample_jpeg
+
+
+@pytest.fixture
+def cache(app_module, tmp_path, monkeypatch):
+    cache = AnalysisCache(str(tmp_path / "analysis.sqlite3"))
+    monkeypatch.setattr(app_module, "analysis_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def prepared(app_module):
+    return app_module.prepare_upload(sample_jpeg((320, 200)))
+
+
+def analyze_concurrently(app_module, prepared, client, prompt, count=8):
+    results, errors = [], []
+    barrier = threading.Barrier(count)
+
+    def one():
+        barrier.wait()
+        try:
+            results.append(app_module.analyze_image_with_openai(prepared, prompt, client=client))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=one) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+
+def test_concurrent_identical_requests_share_one_call(app_module, cache, prepared):
+    client = FakeOpenAIClient(latency=0.2)
+    results, errors = analyze_concurrently(app_module, prepared, client, "warm film")
+    assert not errors
+    assert len(results) == 8 and all(result == results[0] for result in results)
+    assert client.backend.calls == 1
+    assert cache.stats()["misses"] == 1
+
+    # Later callers are served from the cache
+    app_module.analyze_image_with_openai(prepared, "warm film", client=client)
+    assert client.backend.calls == 1
+
+
+def test_errors_reach_every_waiter_and_are_not_cached(app_module, cache, prepared):
+    client = FakeOpenAIClient(latency=0.2, mode="error")
+    results, errors = analyze_concurrently(app_module, prepared, client, "noir")
+    assert not results and len(errors) == 8
+    assert client.backend.calls == 1
+
+    client.backend.mode = "canned"
+    assert app_module.analyze_image_with_openai(prepared, "noir", client=client)["base_style"]
+    assert client.backend.calls == 2
+
+
+def test_expired_entries_are_recomputed_and_purged(app_module, tmp_path, monkeypatch, prepared):
+    cache = AnalysisCache(str(tmp_path / "analysis.sqlite3"), ttl_seconds=0.2, purge_every=1)
+    monkeypatch.setattr(app_module, "analysis_cache", cache)
+    client = FakeOpenAIClient()
+    app_module.analyze_image_with_openai(prepared, "teal", client=client)
+    app_module.analyze_image_with_openai(prepared, "teal", client=client)
+    assert client.backend.calls == 1
+
+    time.sleep(0.3)
+    app_module.analyze_image_with_openai(prepared, "teal", client=client)
+    assert client.backend.calls == 2
+    # Puts purge rows that are past their TTL
+    time.sleep(0.3)
+    app_module.analyze_image_with_openai(prepared, "orange", client=client)
+    assert cache.stats()["purged"] == 1
+
+
+def test_leader_rereads_results_stored_after_its_miss(tmp_path):
+    cache = AnalysisCache(str(tmp_path / "analysis.sqlite3"))
+    read = cache.get
+    misses = iter([True])
+
+    def get(key):
+        # The first read misses; a leader finishes and stores the result right after
+        if next(misses, False):
+            cache.put(key, {"base_style": "stored"})
+            return None
+        return read(key)
+
+    cache.get = get
+    calls = []
+    assert cache.get_or_compute("key", lambda: calls.append(1) or {"base_style": "computed"}) == {"base_style": "stored"}
+    assert not calls
@@ -0,0 +1,35 @@
+import os
+import time
+
+from janitor import STALE_TMP_SECONDS, Janitor
+
+
+def touch(path, age=0, size=10):
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+
+
+def test_sweep_keeps_dotfiles_and_fresh_staging_files(tmp_path):
+    touch(tmp_path / ".gitkeep", age=10_000)
+    touch(tmp_path / "old.cube", age=10_000)
+    touch(tmp_path / "new.cube")
+    touch(tmp_path / "writing.alut.123.456.tmp", age=60)
+    touch(tmp_path / "crashed.alut.1.2.tmp", age=STALE_TMP_SECONDS + 60)
+
+    removed = Janitor({str(tmp_path): (3600, 0)}, interval=0).sweep()
+
+    assert removed == 2
+    assert sorted(os.listdir(tmp_path)) == [".gitkeep", "new.cube", "writing.alut.123.456.tmp"]
+
+
+def test_quota_never_evicts_dotfiles_or_staging_files(tmp_path):
+    touch(tmp_path / ".gitkeep", age=300, size=100)
+    touch(tmp_path / "writing.tmp", age=200, size=100)
+    touch(tmp_path / "a.jpg", age=100, size=100)
+    touch(tmp_path / "b.jpg", size=100)
+
+    Janitor({str(tmp_path): (0, 150)}, interval=0).sweep()
+
+    assert sorted(os.listdir(tmp_path)) == [".gitkeep", "b.jpg", "writing.tmp"]
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from benchmarks.lut_generation import SAMPLE_INSTRUCTIONS
+from lut_apply import (
+    BAKE_MIN_PIXELS_PER_PLANE, INTERPOLATION_METHODS, Uint8TableCache, apply_lut, apply_lut_to_array,
+    bake_uint8_table, uint8_table_error,
+)
+from lut_generator import LUTGenerator
+
+
+def random_rgb(count, seed=0):
+    return np.random.default_rng(seed).random((count, 3), dtype=np.float32)
+
+
+@pytest.mark.parametrize("method", INTERPOLATION_METHODS)
+@pytest.mark.parametrize("size", [2, 17, 33])
+def test_identity_lattice_maps_colors_to_themselves(method, size):
+    lattice = LUTGenerator(lut_size=size).build_identity_lattice()
+    rgb = random_rgb(10000)
+    np.testing.assert_allclose(apply_lut(rgb, lattice, method=method), rgb, atol=1e-5)
+
+    pixels = np.random.default_rng(1).integers(0, 256, size=(64, 64, 3), dtype=np.uint8)
+    np.testing.assert_array_equal(apply_lut_to_array(pixels, lattice, method=method), pixels)
+
+
+def test_tetrahedral_matches_trilinear_on_an_affine_lattice():
+    # Both methods reproduce an affine map exactly, whatever the cell split
+    identity = LUTGenerator(lut_size=17).build_identity_lattice()
+    matrix = np.array([[0.5, 0.2, 0.1], [0.1, 0.6, 0.1], [0.05, 0.15, 0.7]], dtype=np.float32)
+    lattice = identity @ matrix.T + np.float32(0.05)
+    rgb = random_rgb(10000)
+
+    trilinear = apply_lut(rgb, lattice, method="trilinear")
+    tetrahedral = apply_lut(rgb, lattice, method="tetrahedral")
+    np.testing.assert_allclose(tetrahedral, trilinear, atol=1e-5)
+    np.testing.assert_allclose(trilinear, rgb @ matrix.T + 0.05, atol=1e-5)
+
+
+@pytest.mark.parametrize("method", INTERPOLATION_METHODS)
+def test_chunked_output_matches_a_single_chunk(method):
+    lattice = LUTGenerator(lut_size=33).generate_lattice(SAMPLE_INSTRUCTIONS)
+    pixels = np.random.default_rng(2).integers(0, 256, size=(123, 77, 3), dtype=np.uint8)
+    rgb = pixels.astype(np.float32) / 255
+
+    whole = apply_lut_to_array(pixels, lattice, method=method, chunk_pixels=pixels.size)
+    # 1000 does not divide the pixel count, so the last chunk is partial
+    chunked = apply_lut_to_array(pixels, lattice, method=method, chunk_pixels=1000)
+    np.testing.assert_array_equal(chunked, whole)
+    np.testing.assert_array_equal(
+        apply_lut(rgb, lattice, method=method, chunk_pixels=1000),
+        apply_lut(rgb, lattice, method=method, chunk_pixels=rgb.size),
+    )
+
+
+@pytest.mark.parametrize("identity", [True, False], ids=["identity", "generated"])
+def test_uint8_table_is_within_one_level_of_float_trilinear(identity):
+    generator = LUTGenerator(lut_size=33)
+    lattice = generator.build_identity_lattice() if identity else generator.generate_lattice(SAMPLE_INSTRUCTIONS)
+    assert uint8_table_error(lattice, samples=1 << 16)["max"] <= 1
+
+
+def test_uint8_table_cache_skips_baking_small_images():
+    lattice = LUTGenerator(lut_size=17).build_identity_lattice()
+    cache = Uint8TableCache()
+    assert cache.lookup("lut", lattice, 17 * BAKE_MIN_PIXELS_PER_PLANE - 1) is None
+    assert cache.stats()["bakes"] == 0
+
+    table = cache.lookup("lut", lattice, 17 * BAKE_MIN_PIXELS_PER_PLANE)
+    assert table is not None
+    # Once baked, the table is reused even for small images
+    assert cache.lookup("lut", lattice, 1) is table
+
+
+def test_uint8_table_cache_respects_max_bytes():
+    lattice = LUTGenerator(lut_size=17).build_identity_lattice()
+    table_bytes = bake_uint8_table(lattice).nbytes
+    pixels = 17 * BAKE_MIN_PIXELS_PER_PLANE
+
+    # A table larger than the whole budget is returned but never cached
+    cache = Uint8TableCache(max_bytes=table_bytes - 1)
+    assert cache.lookup("lut", lattice, pixels) is not None
+    assert cache.stats()["entries"] == 0 and cache.stats()["bytes"] == 0
+
+    cache = Uint8TableCache(max_bytes=2 * table_bytes)
+    for key in ("a", "b", "c"):
+        cache.lookup(key, lattice, pixels)
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["bytes"] <= 2 * table_bytes
+    # The least recently used table was evicted and is baked again
+    cache.lookup("a", lattice, pixels)
+    assert cache.stats()["bakes"] == 4
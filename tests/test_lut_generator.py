@@ -0,0 +1,105 @@
+import numpy as np
+import pytest
+
+from lut_generator import ALL_STAGES, LUTGenerator, parse_adjustments, parse_cube
+
+INSTRUCTIONS = {
+    "adjustments": {
+        "temperature": "+25",
+        "tint": -5,
+        "exposure": "0.3",
+        "contrast": "+15",
+        "highlights": -20,
+        "shadows": "+15",
+        "whites": 5,
+        "blacks": "-10",
+        "saturation": "+10",
+        "vibrance": 20,
+    },
+    "color_wheels": {
+        "shadows": {"red": "0.0", "green": 0.1, "blue": "+0.3"},
+        "midtones": {"red": "0.05"},
+        "highlights": {"red": 0.2, "green": "0.05", "blue": "-0.1"},
+    },
+}
+
+SPARSE_INSTRUCTIONS = {
+    "adjustments": {"saturation": "-30", "exposure": "bogus"},
+    "color_wheels": {"shadows": {"blue": "0.2"}, "midtones": None, "highlights": {}, "glow": {"red": 1}},
+}
+
+
+def tweaked(instructions, stage):
+    """A copy of ``instructions`` with only ``stage`` changed"""
+    adjustments = dict(instructions.get("adjustments", {}))
+    wheels = {region: dict(wheel) for region, wheel in (instructions.get("color_wheels") or {}).items() if isinstance(wheel, dict)}
+    if stage == "color_wheels":
+        wheels["highlights"] = dict(wheels.get("highlights", {}), blue="0.4")
+    else:
+        adjustments[stage] = parse_adjustments(instructions)[stage] + (0.25 if stage == "exposure" else 7)
+    return {"adjustments": adjustments, "color_wheels": wheels}
+
+
+@pytest.mark.parametrize("instructions", [INSTRUCTIONS, SPARSE_INSTRUCTIONS, {}])
+def test_incremental_matches_generate_lattice(instructions):
+    generator = LUTGenerator(lut_size=9)
+    lattice, checkpoints, reused = generator.generate_lattice_incremental(instructions)
+    assert reused == 0
+    np.testing.assert_array_equal(lattice, generator.generate_lattice(instructions))
+
+    # Every checkpoint holds the state after the stages it is tagged with
+    separable, remaining = generator.split_separable_run()
+    for index, (_, state) in enumerate(checkpoints):
+        stages = separable + remaining[:index]
+        expected = generator.generate_lattice(instructions, stages=stages)
+        for channel, values in enumerate(state):
+            np.testing.assert_array_equal(
+                np.broadcast_to(np.clip(values, 0.0, 1.0), (9, 9, 9)).astype(np.float32), expected[..., channel]
+            )
+
+
+@pytest.mark.parametrize("stage", ALL_STAGES)
+def test_incremental_resume_after_each_stage(stage):
+    generator = LUTGenerator(lut_size=9)
+    _, checkpoints, _ = generator.generate_lattice_incremental(INSTRUCTIONS)
+    changed = tweaked(INSTRUCTIONS, stage)
+    lattice, _, reused = generator.generate_lattice_incremental(changed, checkpoints)
+    np.testing.assert_array_equal(lattice, generator.generate_lattice(changed))
+
+    separable, remaining = generator.split_separable_run()
+    expected_reuse = 0 if stage in separable else len(separable) + remaining.index(stage)
+    assert reused == expected_reuse
+
+
+@pytest.mark.parametrize("instructions", [INSTRUCTIONS, SPARSE_INSTRUCTIONS, {}])
+def test_reference_matches_generate_lattice(instructions):
+    for stage_order in (ALL_STAGES, ALL_STAGES[::-1]):
+        generator = LUTGenerator(lut_size=9, stage_order=stage_order)
+        np.testing.assert_array_equal(
+            generator.generate_lattice_reference(instructions), generator.generate_lattice(instructions)
+        )
+
+
+def test_string_color_wheels_are_normalized():
+    params = parse_adjustments(SPARSE_INSTRUCTIONS)
+    assert params["exposure"] == 0.0
+    assert params["color_wheels"] == {"shadows": {"blue": 0.2}}
+
+
+def test_parse_cube_round_trip():
+    generator = LUTGenerator(lut_size=5)
+    lattice = generator.generate_lattice(INSTRUCTIONS)
+    parsed, _ = parse_cube(generator.generate_cube_bytes(INSTRUCTIONS, lattice=lattice).getvalue())
+    np.testing.assert_allclose(parsed, lattice, atol=1e-6)
+
+
+@pytest.mark.parametrize("text, message", [
+    ("LUT_3D_SIZE 1\n0 0 0\n", "between 2 and"),
+    ("LUT_3D_SIZE 0\n0 0 0\n", "between 2 and"),
+    ("LUT_3D_SIZE 300\n0 0 0\n", "between 2 and"),
+    ("LUT_3D_SIZE two\n0 0 0\n", "Invalid LUT size"),
+    ("LUT_3D_SIZE 2\n" + "0 0 0\n" * 7, "Expected 8 rows"),
+])
+def test_parse_cube_rejects_bad_sizes(text, message):
+    with pytest.raises(ValueError, match=message):
+        parse_cube(text)
@@ -0,0 +1,56 @@
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+
+import lut_pool
+from lut_apply import apply_lut_to_array
+from lut_generator import LUTGenerator
+from lut_pool import LUTProcessPool
+
+
+@pytest.fixture
+def pool():
+    pool = LUTProcessPool(workers=2, min_pixels=0)
+    yield pool
+    pool.shutdown()
+
+
+def block_exists(name):
+    try:
+        block = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return False
+    block.close()
+    return True
+
+
+def test_evicted_lattices_stay_shared_until_released(pool, monkeypatch):
+    monkeypatch.setattr(lut_pool, "MAX_SHARED_LATTICES", 1)
+    lattice = LUTGenerator(lut_size=5).build_identity_lattice()
+    pending = pool._share_lattice(lattice, "a")
+
+    # Sharing another lattice evicts the first, which a task still needs
+    pool._release(pool._share_lattice(lattice, "b"))
+    assert pool.stats()["retired_lattices"] == 1
+    assert block_exists(pending.name)
+
+    pool._release(pending)
+    assert pool.stats()["retired_lattices"] == 0
+    assert not block_exists(pending.name)
+
+
+def test_concurrent_applies_survive_lattice_eviction(pool, monkeypatch):
+    monkeypatch.setattr(lut_pool, "MAX_SHARED_LATTICES", 1)
+    generator = LUTGenerator(lut_size=9)
+    lattices = [generator.build_identity_lattice() ** (1 + index / 4) for index in range(6)]
+    pixels = np.random.default_rng(0).integers(0, 256, size=(64, 64, 3), dtype=np.uint8)
+
+    with ThreadPoolExecutor(max_workers=6) as executor:
+        results = list(executor.map(
+            lambda item: pool.apply(pixels, item[1], key=str(item[0])), enumerate(lattices)
+        ))
+    for lattice, result in zip(lattices, results):
+        np.testing.assert_array_equal(result, apply_lut_to_array(pixels, lattice))
+    assert pool.stats()["retired_lattices"] == 0
@@ -0,0 +1,38 @@
+import io
+
+import pytest
+
+from benchmarks.load_test import sample_jpeg
+
+
+@pytest.fixture
+def offline(app_module, monkeypatch):
+    monkeypatch.setattr(app_module, "OPENAI_AVAILABLE", False)
+    monkeypatch.setitem(app_module.app.config, "LOCAL_ANALYSIS", "auto")
+    return app_module.app.test_client()
+
+
+def post(client, prompt):
+    return client.post("/api/process-lut", data={
+        "prompt": prompt,
+        "lut_size": "17",
+        "image": (io.BytesIO(sample_jpeg((320, 200))), "photo.jpg"),
+    })
+
+
+def test_local_presets_work_without_openai(offline):
+    response = post(offline, "make it slightly warmer")
+    assert response.status_code == 200
+    assert response.get_json()["analysis"]["path"] == "local_preset"
+
+
+def test_prompts_that_need_openai_get_503(offline):
+    assert post(offline, "grade it like a rainy Tuesday in Oslo").status_code == 503
+
+
+def test_batches_run_when_some_prompts_are_local(offline):
+    response = offline.post("/api/process-lut/batch", data={
+        "prompts": ["warm", "grade it like a rainy Tuesday in Oslo"],
+        "images": [(io.BytesIO(sample_jpeg((320, 200))), "photo.jpg")],
+    })
+    assert response.status_code == 200
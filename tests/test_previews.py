@@ -0,0 +1,36 @@
+import io
+import os
+
+from PIL import Image
+
+from benchmarks.load_test import sample_jpeg
+from benchmarks.lut_generation import SAMPLE_INSTRUCTIONS
+from previews import PREVIEW_DIRECTORY
+
+
+def stored(url):
+    return os.path.join(PREVIEW_DIRECTORY, url.rsplit("/", 1)[-1])
+
+
+def test_full_size_previews_render_on_first_request(app_module):
+    prepared = app_module.prepare_upload(sample_jpeg((1200, 800)))
+    lut_entry = app_module.get_or_create_lut(SAMPLE_INSTRUCTIONS, 17)
+    previews = app_module.create_preview_variants(prepared, lut_entry)
+
+    assert os.path.exists(stored(previews["medium"]["jpeg"]))
+    assert (previews["full"]["width"], previews["full"]["height"]) == (1200, 800)
+    assert not os.path.exists(stored(previews["full"]["jpeg"]))
+
+    client = app_module.app.test_client()
+    response = client.get(previews["full"]["jpeg"])
+    assert response.status_code == 200
+    assert Image.open(io.BytesIO(response.data)).size == (1200, 800)
+    assert os.path.exists(stored(previews["full"]["jpeg"]))
+    # The same inputs name the same file, so a second request reuses it
+    assert app_module.create_preview_variants(prepared, lut_entry)["full"] == previews["full"]
+    assert client.get(previews["full"]["jpeg"], headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+
+def test_unknown_previews_are_not_found(app_module):
+    client = app_module.app.test_client()
+    assert client.get("/previews/full_0123456789abcdef0123.jpg").status_code == 404
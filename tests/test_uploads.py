@@ -0,0 +1,30 @@
+import io
+
+import pytest
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+def upload(size):
+    return {"image": (io.BytesIO(b"\0" * size), "big.jpg")}
+
+
+def test_regular_routes_keep_the_upload_limit(app_module, client, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, "UPLOAD_MAX_BYTES", 1024)
+    response = client.post("/api/process-lut", data=upload(4096))
+    assert response.status_code == 413
+    assert response.get_json()["max_bytes"] == 1024
+
+
+def test_video_uploads_may_exceed_the_upload_limit(app_module, client, monkeypatch):
+    monkeypatch.setitem(app_module.app.config, "UPLOAD_MAX_BYTES", 1024)
+    # Past the size check the route looks the LUT up, so a missing one is a 404
+    response = client.post("/api/luts/missing.cube/apply-video", data=upload(4096))
+    assert response.status_code == 404
+
+    monkeypatch.setitem(app_module.app.config, "VIDEO_MAX_BYTES", 2048)
+    response = client.post("/api/luts/missing.cube/apply-video", data=upload(4096))
+    assert response.status_code == 413
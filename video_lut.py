@@ -0,0 +1,299 @@
+"""Apply a LUT to video files and image sequences as a streaming pipeline.
+
+Frames are decoded, graded and encoded on three threads connected by
+bounded queues, so memory stays at a few batches of frames however long
+the footage is. Run from the repository root:
+
+    python -m video_lut adaptive_lut_<id>.cube input.mp4 output.mp4
+    python -m video_lut path/to/grade.cube frames_dir/ graded_frames/
+"""
+import argparse
+import glob
+import hashlib
+import os
+import queue
+import resource
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from lut_apply import INTERPOLATION_METHODS, apply_lut_to_array
+from lut_store import SIDECAR_EXTENSION, load_lut
+
+VIDEO_EXTENSIONS = {".mp4", ".mov", ".avi", ".mkv", ".m4v", ".webm"}
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp"}
+# Frames graded together per batch, and batches buffered between stages
+DEFAULT_BATCH_FRAMES = 8
+DEFAULT_QUEUE_BATCHES = 2
+DEFAULT_FOURCC = "mp4v"
+DEFAULT_FPS = 24.0
+LUT_DIRECTORY = "static/luts"
+
+_END = object()
+
+def load_lattice(lut):
+    """Load a lattice from a .alut sidecar, a .cube file or a generated LUT name"""
+    stem, extension = os.path.splitext(lut)
+    if not os.path.exists(lut):
+        sidecar = os.path.join(LUT_DIRECTORY, os.path.basename(stem) + SIDECAR_EXTENSION)
+        if not os.path.exists(sidecar):
+            raise FileNotFoundError(f"LUT not found: {lut}")
+        lut, extension = sidecar, SIDECAR_EXTENSION
+    if extension == SIDECAR_EXTENSION:
+        return load_lut(lut)[0]
+    from lut_generator import parse_cube
+    with open(lut, "rb") as f:
+        return parse_cube(f.read())[0]
+
+def current_rss_bytes():
+    """Resident set size of this process, falling back to the lifetime peak"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+        return peak if sys.platform == "darwin" else peak * 1024
+
+def is_video(path):
+    return os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS
+
+def sequence_paths(source):
+    """Sorted image paths for a directory or glob pattern"""
+    pattern = os.path.join(source, "*") if os.path.isdir(source) else source
+    paths = sorted(p for p in glob.glob(pattern) if os.path.splitext(p)[1].lower() in IMAGE_EXTENSIONS)
+    if not paths:
+        raise ValueError(f"No image frames found in {source}")
+    return paths
+
+def iter_frames(source):
+    """Yield BGR uint8 frames from a video file or an image sequence one at a time"""
+    if is_video(source):
+        capture = cv2.VideoCapture(source)
+        if not capture.isOpened():
+            raise ValueError(f"Cannot open video: {source}")
+        try:
+            while True:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                yield frame
+        finally:
+            capture.release()
+    else:
+        for path in sequence_paths(source):
+            frame = cv2.imread(path, cv2.IMREAD_COLOR)
+            if frame is None:
+                raise ValueError(f"Cannot read frame: {path}")
+            yield frame
+
+def source_fps(source):
+    """Frame rate of a video source, or DEFAULT_FPS for image sequences"""
+    if not is_video(source):
+        return DEFAULT_FPS
+    capture = cv2.VideoCapture(source)
+    try:
+        return capture.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+    finally:
+        capture.release()
+
+def iter_batches(frames, batch_frames):
+    """Group consecutive same-sized frames into (B, H, W, 3) arrays"""
+    batch = []
+    for frame in frames:
+        if batch and frame.shape != batch[0].shape:
+            yield np.stack(batch)
+            batch = []
+        batch.append(frame)
+        if len(batch) == batch_frames:
+            yield np.stack(batch)
+            batch = []
+    if batch:
+        yield np.stack(batch)
+
+class FrameWriter:
+    """Write BGR frames to a video file, or to a directory as numbered images"""
+
+    def __init__(self, output, fps=DEFAULT_FPS, fourcc=DEFAULT_FOURCC, image_format="png"):
+        self.output = output
+        self.fps = fps
+        self.fourcc = fourcc
+        self.image_format = image_format
+        self.frames = 0
+        self._writer = None
+        if not is_video(output):
+            os.makedirs(output, exist_ok=True)
+
+    def write(self, frame):
+        if is_video(self.output):
+            if self._writer is None:
+                height, width = frame.shape[:2]
+                self._writer = cv2.VideoWriter(self.output, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, (width, height))
+                if not self._writer.isOpened():
+                    raise ValueError(f"Cannot open video writer for {self.output}")
+            self._writer.write(frame)
+        else:
+            path = os.path.join(self.output, f"frame_{self.frames:06d}.{self.image_format}")
+            if not cv2.imwrite(path, frame):
+                raise ValueError(f"Cannot write frame: {path}")
+        self.frames += 1
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.release()
+            self._writer = None
+
+def _put(q, item, stop):
+    """Put ``item`` on a bounded queue, giving up once ``stop`` is set"""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _drain(q, stop):
+    """Yield items from a queue until the end marker, or until ``stop`` is set"""
+    while not stop.is_set():
+        try:
+            item = q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+        if item is _END:
+            return
+        yield item
+
+def _stage(name, items, outbox, work, stop, busy):
+    """Pass every item through ``work`` (or as is, when None) to ``outbox``
+
+    Time spent producing items (when ``work`` is None) or in ``work`` is
+    added to ``busy[name]``. Errors travel downstream in place of results so
+    the consumer re-raises them.
+    """
+    try:
+        items = iter(items)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(items)
+            except StopIteration:
+                break
+            if isinstance(item, Exception):
+                _put(outbox, item, stop)
+                return
+            if work is not None:
+                start = time.perf_counter()
+                item = work(item)
+            busy[name] += time.perf_counter() - start
+            if not _put(outbox, item, stop):
+                return
+    except Exception as e:
+        _put(outbox, e, stop)
+        return
+    _put(outbox, _END, stop)
+
+def apply_lut_to_stream(source, output, lattice, method="trilinear", batch_frames=DEFAULT_BATCH_FRAMES,
+                        queue_batches=DEFAULT_QUEUE_BATCHES, fps=None, fourcc=DEFAULT_FOURCC, pool=None):
+    """Grade every frame of ``source`` through ``lattice`` into ``output``
+
+    ``source`` is a video file, a directory of frames or a glob pattern;
+    ``output`` is a video file (by extension) or a directory for numbered
+    frames. Decoding and grading run on worker threads feeding bounded
+    queues while this thread encodes. Pass a ``LUTProcessPool`` as ``pool``
+    to grade each batch across processes. Returns the run statistics.
+    """
+    if method not in INTERPOLATION_METHODS:
+        raise ValueError(f"Unknown interpolation method: {method}")
+    writer = FrameWriter(output, fps=fps or source_fps(source), fourcc=fourcc)
+    decoded = queue.Queue(maxsize=queue_batches)
+    graded = queue.Queue(maxsize=queue_batches)
+    stop = threading.Event()
+    busy = {"decode": 0.0, "apply": 0.0, "encode": 0.0}
+
+    lattice_key = None
+    if pool is not None:
+        lattice_key = hashlib.sha256(np.ascontiguousarray(lattice, dtype=np.float32).tobytes()).hexdigest()
+
+    def grade(batch):
+        # OpenCV frames are BGR; the lattice maps RGB
+        rgb = np.ascontiguousarray(batch[..., ::-1])
+        if pool is not None:
+            return pool.apply(rgb, lattice, method=method, key=lattice_key)[..., ::-1]
+        return apply_lut_to_array(rgb, lattice, method=method)[..., ::-1]
+
+    threads = [
+        threading.Thread(target=_stage, args=("decode", iter_batches(iter_frames(source), batch_frames), decoded, None, stop, busy), daemon=True),
+        threading.Thread(target=_stage, args=("apply", _drain(decoded, stop), graded, grade, stop, busy), daemon=True),
+    ]
+    start = time.perf_counter()
+    peak_rss = current_rss_bytes()
+    batches = 0
+    try:
+        for thread in threads:
+            thread.start()
+        for batch in _drain(graded, stop):
+            if isinstance(batch, Exception):
+                raise batch
+            encode_start = time.perf_counter()
+            for frame in batch:
+                writer.write(np.ascontiguousarray(frame))
+            busy["encode"] += time.perf_counter() - encode_start
+            batches += 1
+            peak_rss = max(peak_rss, current_rss_bytes())
+    finally:
+        stop.set()
+        writer.close()
+        for thread in threads:
+            thread.join()
+
+    seconds = time.perf_counter() - start
+    return {
+        "frames": writer.frames,
+        "batches": batches,
+        "seconds": round(seconds, 3),
+        "fps": round(writer.frames / seconds, 2) if seconds else 0.0,
+        "peak_rss_mb": round(peak_rss / (1024 * 1024), 1),
+        "stage_seconds": {name: round(value, 3) for name, value in busy.items()},
+        "lut_size": int(lattice.shape[0]),
+        "method": method,
+        "batch_frames": batch_frames,
+        "workers": pool.workers if pool is not None else 1,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply a LUT to a video file or image sequence")
+    parser.add_argument("lut", help="generated LUT name, .alut sidecar or .cube file")
+    parser.add_argument("source", help="video file, frame directory or glob pattern")
+    parser.add_argument("output", help="output video file or frame directory")
+    parser.add_argument("--method", choices=INTERPOLATION_METHODS, default="trilinear")
+    parser.add_argument("--batch-frames", type=int, default=DEFAULT_BATCH_FRAMES)
+    parser.add_argument("--queue-batches", type=int, default=DEFAULT_QUEUE_BATCHES)
+    parser.add_argument("--fps", type=float, default=None, help="output frame rate (default: the source's)")
+    parser.add_argument("--fourcc", default=DEFAULT_FOURCC)
+    parser.add_argument("--workers", type=int, default=1, help="grade batches across this many processes")
+    args = parser.parse_args(argv)
+
+    pool = None
+    if args.workers > 1:
+        from lut_pool import LUTProcessPool
+        pool = LUTProcessPool(workers=args.workers)
+    try:
+        stats = apply_lut_to_stream(
+            args.source, args.output, load_lattice(args.lut), method=args.method,
+            batch_frames=args.batch_frames, queue_batches=args.queue_batches, fps=args.fps, fourcc=args.fourcc,
+            pool=pool,
+        )
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    print(f"🎬 {stats['frames']} frames in {stats['seconds']}s on {stats['workers']} process(es) "
+          f"({stats['fps']} fps, peak RSS {stats['peak_rss_mb']} MB)")
+    print(f"   decode {stats['stage_seconds']['decode']}s, apply {stats['stage_seconds']['apply']}s, "
+          f"encode {stats['stage_seconds']['encode']}s")
+
+if __name__ == "__main__":
+    main()